@@ -5,10 +5,21 @@ from os import environ
 from dotenv import load_dotenv
 
 from config.logging_config import setup_logging
-from database.engine import create_db, session_maker
+from database.engine import create_db, engine, session_maker
+from database.counters import message_counter
+from database.members import member_status
+from database.usernames import username_index
+from database.retention import history_retention
 
 from middlewares.stat import MessageCounterMiddleware
 from middlewares.db import DbSessionMiddleware
+from middlewares.api_scheduler import api_scheduler
+from middlewares.admins import AdminRosterMiddleware
+from middlewares.members import MemberStatusMiddleware
+from middlewares.usernames import UsernameIndexMiddleware
+
+from services.log_service import log_queue
+from services.scan_service import scan_pool
 
 from handlers.user_private import user_private_router
 from handlers.moderation import moderation_router
@@ -34,6 +45,8 @@ bot = Bot(
     token=environ.get('BOT_TOKEN'), # write your secret bot token in .env file
     default=DefaultBotProperties(parse_mode=ParseMode.HTML),
 )
+# rate limits, priorities and RetryAfter handling for every outgoing request
+bot.session.middleware(api_scheduler)
 
 dp = Dispatcher()
 dp.include_routers(
@@ -52,6 +65,34 @@ async def main():
 
     dp.update.middleware(DbSessionMiddleware(session_pool=session_maker))
     dp.message.middleware(MessageCounterMiddleware())
+    dp.message.outer_middleware(UsernameIndexMiddleware())
+
+    # outer: member updates reach the roster even when no handler matches them
+    dp.chat_member.outer_middleware(AdminRosterMiddleware())
+    dp.my_chat_member.outer_middleware(AdminRosterMiddleware())
+    dp.chat_member.outer_middleware(MemberStatusMiddleware())
+    dp.chat_member.outer_middleware(UsernameIndexMiddleware())
+
+    api_scheduler.start()
+    dp.shutdown.register(api_scheduler.shutdown)
+
+    log_queue.start(bot)
+    dp.shutdown.register(log_queue.shutdown)
+
+    scan_pool.start()
+    dp.shutdown.register(scan_pool.shutdown)
+
+    message_counter.start(session_maker)
+    dp.shutdown.register(message_counter.shutdown)
+
+    member_status.start(session_maker)
+    dp.shutdown.register(member_status.shutdown)
+
+    username_index.start(session_maker)
+    dp.shutdown.register(username_index.shutdown)
+
+    history_retention.start(engine)
+    dp.shutdown.register(history_retention.shutdown)
 
     await bot.delete_webhook(drop_pending_updates=True)
     await bot.set_my_commands(
@@ -70,4 +111,5 @@ async def main():
     await dp.start_polling(bot, allowed_updates=ALLOWED_UPDATES)
 
 
-asyncio.run(main())
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""
+Compares the ban-word automaton with the old per-word substring loop.
+
+Run from the app directory:
+    python -m benchmarks.bench_banwords
+"""
+
+import random
+import time
+
+from utils.matcher import BadWordMatcher
+from utils.text import get_dictionary, normalize, normalize_bad_words
+
+from benchmarks.corpus import EN_WORDS, RU_WORDS
+
+
+BAD_WORDS = normalize_bad_words(get_dictionary().words)
+BAD_WORDS_MATCHER = get_dictionary().matcher
+
+CLEAN_WORDS = RU_WORDS + EN_WORDS
+
+
+def legacy_find_all(normalized: str) -> list[str]:
+    """
+    The loop contains_bad_word used before the automaton, over the same normalized words.
+    """
+
+    return [entry for bad_word, entry in BAD_WORDS.items() if bad_word in normalized]
+
+
+def make_corpus(size: int, length: int, seed: int = 42) -> list[str]:
+    rng = random.Random(seed)
+    bad_words = sorted(BAD_WORDS)
+    corpus = []
+
+    for _ in range(size):
+        words = []
+        while sum(len(w) + 1 for w in words) < length:
+            if rng.random() < 0.05:
+                words.append(rng.choice(bad_words))
+            else:
+                words.append(rng.choice(CLEAN_WORDS))
+        corpus.append(normalize(" ".join(words)))
+
+    return corpus
+
+
+def measure(func, corpus: list[str]) -> float:
+    start = time.perf_counter()
+    for text in corpus:
+        func(text)
+    return time.perf_counter() - start
+
+
+def main():
+    start = time.perf_counter()
+    BadWordMatcher(BAD_WORDS)
+    build_time = time.perf_counter() - start
+
+    print(f"ban words: {len(BAD_WORDS)}, automaton states: {len(BAD_WORDS_MATCHER)}")
+    print(f"automaton build: {build_time * 1000:.1f} ms\n")
+
+    for length in (40, 400, 4096):
+        corpus = make_corpus(size=200, length=length)
+
+        for text in corpus:
+            assert set(BAD_WORDS_MATCHER.find_all(text)) == set(legacy_find_all(text))
+
+        legacy = measure(legacy_find_all, corpus)
+        automaton = measure(BAD_WORDS_MATCHER.find_all, corpus)
+
+        print(
+            f"{length:>5} chars | loop: {legacy / len(corpus) * 1e6:>9.1f} us/msg"
+            f" | automaton: {automaton / len(corpus) * 1e6:>8.1f} us/msg"
+            f" | x{legacy / automaton:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Compares the per-message cost of the old cleaner checks with scan_text.
+
+Run from the app directory:
+    python -m benchmarks.bench_scanner
+"""
+
+import random
+import re
+import time
+
+from utils.text import contains_bad_word, get_dictionary, scan_text
+
+from benchmarks.corpus import EN_WORDS, RU_WORDS
+
+
+def legacy_cleaner_checks(text: str):
+    """
+    The checks cleaner ran before scan_text: an uncompiled link search,
+    then the ban-word scan once for the condition and once more for the reply.
+    """
+
+    if re.findall(r'(https?://)?t\.me/[^\s]+', text):
+        return "link"
+
+    if contains_bad_word(text):
+        return ' '.join(contains_bad_word(text))
+
+    return None
+
+
+def make_messages(size: int, length: int, seed: int = 42) -> list[str]:
+    rng = random.Random(seed)
+    bad_words = sorted(get_dictionary().words)
+    messages = []
+
+    for _ in range(size):
+        words = []
+        while sum(len(w) + 1 for w in words) < length:
+            if rng.random() < 0.03:
+                words.append(rng.choice(bad_words))
+            else:
+                words.append(rng.choice(RU_WORDS + EN_WORDS).capitalize())
+
+        # one message in ten advertises a channel
+        if rng.random() < 0.1:
+            words.insert(rng.randrange(len(words)), f"https://t.me/channel{rng.randint(1, 999)}")
+
+        messages.append(" ".join(words))
+
+    return messages
+
+
+def measure(func, messages: list[str]) -> float:
+    start = time.perf_counter()
+    for text in messages:
+        func(text)
+    return (time.perf_counter() - start) / len(messages)
+
+
+def main():
+    for length in (40, 400, 4096):
+        messages = make_messages(size=300, length=length)
+
+        before = measure(legacy_cleaner_checks, messages)
+        after = measure(scan_text, messages)
+
+        print(
+            f"{length:>5} chars | before: {before * 1e6:>8.1f} us/msg"
+            f" | scan_text: {after * 1e6:>8.1f} us/msg | x{before / after:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
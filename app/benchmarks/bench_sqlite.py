@@ -0,0 +1,107 @@
+"""
+Compares the write throughput of the SQLite profiles from config.SQLITE_PROFILES.
+
+Each profile gets a fresh database file. Two workloads are measured:
+sequential single-row commits, like the per-message counter writes,
+and concurrent writers with their own sessions, like moderation commands
+arriving at the same time.
+
+Run from the app directory:
+    python -m benchmarks.bench_sqlite
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+
+from pathlib import Path
+
+from sqlalchemy import update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from config.config import SQLITE_PROFILES
+from database.engine import apply_sqlite_profile
+from database.models import Base, User
+
+
+USERS = 100
+
+
+async def _increment(session_maker: async_sessionmaker, user_id: int) -> bool:
+    try:
+        async with session_maker() as session:
+            await session.execute(
+                update(User)
+                .where(User.id == user_id, User.chat_id == 1)
+                .values(count_messages=User.count_messages + 1)
+            )
+            await session.commit()
+
+    except OperationalError:
+        # "database is locked"
+        return False
+
+    return True
+
+
+async def bench_profile(name: str, pragmas: dict, commits: int, writers: int, directory: Path) -> dict:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{directory / name}.sqlite3")
+    apply_sqlite_profile(engine, pragmas)
+    session_maker = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with session_maker() as session:
+        session.add_all(User(id=i, chat_id=1, count_messages=0) for i in range(USERS))
+        await session.commit()
+
+    start = time.perf_counter()
+    for i in range(commits):
+        await _increment(session_maker, i % USERS)
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = await _run_concurrent(session_maker, commits, max(1, writers))
+    concurrent = time.perf_counter() - start
+
+    await engine.dispose()
+
+    return {
+        "profile": name,
+        "sequential_commits_per_sec": round(commits / sequential),
+        "concurrent_commits_per_sec": round(commits / concurrent),
+        "locked_errors": results.count(False),
+    }
+
+
+async def _run_concurrent(session_maker: async_sessionmaker, commits: int, writers: int) -> list[bool]:
+    async def writer(offset: int) -> list[bool]:
+        return [await _increment(session_maker, i % USERS) for i in range(offset, commits, writers)]
+
+    batches = await asyncio.gather(*(writer(offset) for offset in range(writers)))
+    return [ok for batch in batches for ok in batch]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="SQLite profile write benchmark")
+    parser.add_argument("--commits", type=int, default=2000)
+    parser.add_argument("--writers", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, pragmas in SQLITE_PROFILES.items():
+            result = await bench_profile(name, pragmas, args.commits, args.writers, Path(directory))
+
+            print(
+                f"{result['profile']:12} "
+                f"sequential: {result['sequential_commits_per_sec']:>6} commits/s   "
+                f"{args.writers} writers: {result['concurrent_commits_per_sec']:>6} commits/s   "
+                f"locked: {result['locked_errors']}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+"""
+Compares moderation actions per second of the single-statement upserts in database.requests
+with the old get-then-modify ORM pattern.
+
+Run from the app directory:
+    python -m benchmarks.bench_upserts
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from config.config import MAX_WARNS, SQLITE_PROFILE, SQLITE_PROFILES
+from database.engine import apply_sqlite_profile
+from database.models import Base, User
+from database.requests import add_warn
+
+
+USERS = 200
+
+
+async def legacy_add_warn(session: AsyncSession, user_id: int, chat_id: int):
+    """
+    add_warn before the upsert: a SELECT round trip, then an INSERT or UPDATE on flush.
+    """
+
+    user = await session.get(User, (user_id, chat_id))
+
+    if not user:
+        user = User(id=user_id, chat_id=chat_id)
+        session.add(user)
+
+    user.count_warns = (user.count_warns or 0) + 1
+
+    current_warns = user.count_warns
+
+    if user.count_warns >= MAX_WARNS:
+        user.count_warns = 0
+        user.count_mutes = (user.count_mutes or 0) + 1
+        user.is_muted = True
+
+    return current_warns, user.count_mutes or 0
+
+
+async def measure(func, session_maker: async_sessionmaker, actions: int) -> float:
+    start = time.perf_counter()
+
+    for i in range(actions):
+        async with session_maker() as session:
+            await func(session, i % USERS, 1)
+            await session.commit()
+
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="User counter upsert benchmark")
+    parser.add_argument("--actions", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, func in (("get + modify", legacy_add_warn), ("upsert", add_warn)):
+            engine = create_async_engine(f"sqlite+aiosqlite:///{Path(directory) / name}.sqlite3")
+            apply_sqlite_profile(engine, SQLITE_PROFILES[SQLITE_PROFILE])
+            session_maker = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+
+            seconds = await measure(func, session_maker, args.actions)
+            await engine.dispose()
+
+            print(f"{name:14} {args.actions / seconds:>8.0f} warns/s   {seconds * 1e6 / args.actions:>7.0f} us/warn")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+"""
+Deterministic Russian/English chat corpora for the text pipeline benchmarks.
+"""
+
+import random
+
+from utils.text import get_dictionary
+
+
+RU_WORDS = [
+    "привет", "как", "дела", "сегодня", "погода", "отличная", "спасибо", "группа",
+    "новости", "бот", "работает", "завтра", "встреча", "в", "на", "и", "что",
+    "это", "очень", "хорошо", "смотри", "вопрос", "ответ", "ссылка", "канал",
+    "фото", "видео", "купить", "продам", "цена", "рублей", "пожалуйста",
+]
+
+EN_WORDS = [
+    "hello", "world", "meeting", "tomorrow", "thanks", "please", "the", "a",
+    "is", "check", "this", "out", "great", "news", "channel", "price", "today",
+]
+
+EMOJI = ["🔥", "😂", "👍", "❤️", "🤣", "🙏"]
+
+# Cyrillic letters and the Latin look-alikes obfuscated texts swap in for them
+LOOKALIKES = {"а": "a", "е": "e", "о": "0", "р": "p", "с": "c", "у": "y", "к": "k"}
+
+
+def _sentence(rng: random.Random, length: int, bad_ratio: float, bad_words: list[str]) -> str:
+    words = []
+
+    while sum(len(w) + 1 for w in words) < length:
+        roll = rng.random()
+
+        if roll < bad_ratio:
+            words.append(rng.choice(bad_words))
+        elif roll < 0.7:
+            words.append(rng.choice(RU_WORDS))
+        elif roll < 0.95:
+            words.append(rng.choice(EN_WORDS))
+        else:
+            words.append(rng.choice(EMOJI))
+
+    text = " ".join(words)
+    return text[:1].upper() + text[1:] + rng.choice([".", "!", "?", ""])
+
+
+def make_corpora(size: int = 500, seed: int = 42) -> dict[str, list[str]]:
+    """
+    Returns named corpora of chat messages: short messages, long captions,
+    texts with links, texts full of profanity and texts with look-alike letters mixed in.
+    """
+
+    rng = random.Random(seed)
+    bad_words = sorted(get_dictionary().words)
+
+    corpora = {
+        "short": [_sentence(rng, rng.randint(5, 60), 0.02, bad_words) for _ in range(size)],
+        "caption": [_sentence(rng, rng.randint(1000, 4096), 0.01, bad_words) for _ in range(size)],
+        "links": [],
+        "profanity": [_sentence(rng, rng.randint(20, 200), 0.4, bad_words) for _ in range(size)],
+        "obfuscated": [],
+    }
+
+    for _ in range(size):
+        text = _sentence(rng, rng.randint(20, 300), 0.02, bad_words)
+        link = rng.choice(["https://t.me/", "t.me/", "http://t.me/joinchat/"]) + f"channel{rng.randint(1, 9999)}"
+        position = rng.randint(0, len(text))
+        corpora["links"].append(f"{text[:position]} {link} {text[position:]}")
+
+    for _ in range(size):
+        text = _sentence(rng, rng.randint(20, 300), 0.05, bad_words)
+        corpora["obfuscated"].append(
+            "".join(LOOKALIKES.get(char, char) if rng.random() < 0.3 else char for char in text)
+        )
+
+    return corpora
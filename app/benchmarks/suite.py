@@ -0,0 +1,195 @@
+"""
+Benchmark suite for the moderation text pipeline.
+
+Times the scanning functions against the real database/banwords.txt on generated
+Russian/English chat corpora and reports messages/sec, p50/p99 latency and peak memory.
+The results are written as JSON so runs from different releases can be compared.
+
+Run from the app directory:
+    python -m benchmarks.suite --output bench.json
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from datetime import datetime, timezone
+
+from config.config import BAD_WORDS_INDEX_FILE
+from database.word_store import ban_word_store, extract_word
+from utils.index import load_index
+from utils.matcher import BadWordMatcher
+from utils.text import (
+    BASE_DIR,
+    _index_fingerprint,
+    contains_bad_word,
+    contains_link,
+    get_dictionary,
+    load_bad_words,
+    normalize,
+    normalize_bad_words,
+    scan_text,
+    source_digest,
+)
+
+from benchmarks.corpus import make_corpora
+
+
+CASES = {
+    "normalize": normalize,
+    "contains_bad_word": contains_bad_word,
+    "contains_link": contains_link,
+    "scan_text": scan_text,
+    "extract_word": extract_word,
+    "store_contains": ban_word_store.contains,
+}
+
+
+def _percentile(sorted_values: list[int], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+def _peak_memory(func, *args) -> int:
+    """
+    Peak number of bytes allocated by Python while running func.
+    """
+
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(func, texts: list[str], repeat: int) -> dict:
+    """
+    Times func on every text and summarizes the per-message latencies.
+    """
+
+    for text in texts[:50]:
+        func(text)
+
+    latencies = []
+    perf_counter_ns = time.perf_counter_ns
+
+    for _ in range(repeat):
+        for text in texts:
+            start = perf_counter_ns()
+            func(text)
+            latencies.append(perf_counter_ns() - start)
+
+    latencies.sort()
+
+    def scan_all(texts):
+        for text in texts:
+            func(text)
+
+    return {
+        "messages": len(latencies),
+        "messages_per_sec": round(len(latencies) / (sum(latencies) / 1e9), 1),
+        "mean_us": round(sum(latencies) / len(latencies) / 1e3, 2),
+        "p50_us": round(_percentile(latencies, 0.50) / 1e3, 2),
+        "p99_us": round(_percentile(latencies, 0.99) / 1e3, 2),
+        "peak_memory_bytes": _peak_memory(scan_all, texts),
+    }
+
+
+def bench_dictionary() -> dict:
+    """
+    Cost of compiling the automaton from banwords.txt and of mapping its prebuilt index.
+    """
+
+    start = time.perf_counter()
+    words = load_bad_words()
+    patterns = normalize_bad_words(words)
+    matcher = BadWordMatcher(patterns)
+    build_seconds = time.perf_counter() - start
+
+    source = source_digest(words)
+
+    start = time.perf_counter()
+    mapped = load_index(BASE_DIR / BAD_WORDS_INDEX_FILE, source, _index_fingerprint())
+    load_seconds = time.perf_counter() - start
+
+    return {
+        "words": len(words),
+        "patterns": len(patterns),
+        "states": len(matcher),
+        "build_ms": round(build_seconds * 1e3, 1),
+        "index_load_ms": round(load_seconds * 1e3, 2) if mapped else None,
+        "build_peak_memory_bytes": _peak_memory(
+            lambda: BadWordMatcher(normalize_bad_words(load_bad_words()))
+        ),
+    }
+
+
+def run_suite(size: int, repeat: int, seed: int) -> dict:
+    corpora = make_corpora(size=size, seed=seed)
+
+    results = []
+    for corpus_name, texts in corpora.items():
+        for case_name, func in CASES.items():
+            results.append({"function": case_name, "corpus": corpus_name, **run_case(func, texts, repeat)})
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "corpus_size": size,
+            "repeat": repeat,
+            "seed": seed,
+            "dictionary_version": get_dictionary().version,
+        },
+        "dictionary": bench_dictionary(),
+        "results": results,
+    }
+
+
+def print_table(report: dict):
+    dictionary = report["dictionary"]
+    print(
+        f"dictionary: {dictionary['words']} words, {dictionary['patterns']} patterns, "
+        f"{dictionary['states']} states, built in {dictionary['build_ms']} ms",
+        file=sys.stderr,
+    )
+    print(
+        f"{'function':<18} {'corpus':<10} {'msg/s':>12} {'p50 us':>10} {'p99 us':>10} {'peak KiB':>10}",
+        file=sys.stderr,
+    )
+
+    for row in report["results"]:
+        print(
+            f"{row['function']:<18} {row['corpus']:<10} {row['messages_per_sec']:>12.1f} "
+            f"{row['p50_us']:>10.2f} {row['p99_us']:>10.2f} {row['peak_memory_bytes'] / 1024:>10.1f}",
+            file=sys.stderr,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=500, help="messages per corpus")
+    parser.add_argument("--repeat", type=int, default=3, help="timed passes over each corpus")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = run_suite(size=args.size, repeat=args.repeat, seed=args.seed)
+    print_table(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -34,6 +34,89 @@ DEFAULT_MUTE_TIME = {
 }
 
 BAD_WORDS_FILE = "database/banwords.txt"
+# edits made since BAD_WORDS_FILE was last rewritten, one "+word" or "-word" per line
+BAD_WORDS_LOG_FILE = "database/banwords.log"
+# the log is folded back into BAD_WORDS_FILE after this many edits
+BAD_WORDS_COMPACT_AFTER = 500
+# compiled form of BAD_WORDS_FILE, rebuilt automatically when the list changes;
+# kept out of database/, which is a volume in the Docker setup, so the image can ship it prebuilt
+BAD_WORDS_INDEX_FILE = "index/banwords.idx"
+# the running bot checks the ban-word files for edits at most this often, in seconds
+BAD_WORDS_RELOAD_CHECK_INTERVAL = 10
+
+# how many chats keep their compiled profanity filter in memory
+CHAT_MATCHER_CACHE_SIZE = 1000
+
+# per-chat settings are reread from the database after this many seconds
+CHAT_SETTINGS_TTL = 10 * 60
+# how many chats keep their settings in memory
+CHAT_SETTINGS_CACHE_SIZE = 5000
+
+# chat administrators are reloaded from the API at most this often, in seconds;
+# chat_member updates keep the list current in between
+ADMIN_ROSTER_TTL = 30 * 60
+# how many chats keep their administrator list in memory
+ADMIN_ROSTER_CACHE_SIZE = 5000
+
+# a mirrored member status older than this is checked with the API again, in seconds
+MEMBER_STATUS_TTL = 6 * 60 * 60
+# how many member statuses are kept in memory
+MEMBER_STATUS_CACHE_SIZE = 20000
+# status changes are written to the database every N seconds
+MEMBER_STATUS_FLUSH_INTERVAL = 10
+
+# outgoing API requests: at most API_GLOBAL_RATE per second overall,
+# and API_CHAT_RATE messages per second to one group after a burst of API_CHAT_BURST
+API_GLOBAL_RATE = 30
+API_GLOBAL_BURST = 30
+API_CHAT_RATE = 20 / 60
+API_CHAT_BURST = 20
+# a request answered with RetryAfter is sent again after the wait this many times
+API_MAX_RETRIES = 3
+# queue depths and counters of the request scheduler are logged this often, in seconds
+API_METRICS_INTERVAL = 5 * 60
+
+# admin-log entries for one log chat within this many seconds are sent as one message
+LOG_COALESCE_WINDOW = 3
+# entries waiting for delivery; while the queue is full new entries are dropped
+LOG_QUEUE_SIZE = 1000
+# number of background log senders
+LOG_WORKERS = 2
+# seconds to wait before each retry of a failed log delivery
+LOG_RETRY_DELAYS = (1, 5, 30)
+
+# how many (chat, @username) entries are kept in memory for /mute @username and /ban @username
+USERNAME_INDEX_CACHE_SIZE = 50000
+# new and changed usernames are written to the database every N seconds
+USERNAME_INDEX_FLUSH_INTERVAL = 10
+
+# texts at least this long are scanned in a worker process instead of the event loop
+SCAN_OFFLOAD_LENGTH = 1024
+# number of scanning worker processes, 0 scans every text inline
+SCAN_POOL_SIZE = 2
+# how many scan results of recently seen texts are remembered, 0 disables the cache
+SCAN_CACHE_SIZE = 10000
+
+# message counters are written to the database every N seconds,
+# or sooner once this many users have unsaved messages
+MESSAGE_COUNTER_FLUSH_INTERVAL = 10
+MESSAGE_COUNTER_FLUSH_SIZE = 500
+
+# moderation history and inactive users older than this are moved to compressed archives, 0 keeps everything
+HISTORY_RETENTION_DAYS = 90
+# archives are written as <table>/<YYYY-MM>.jsonl.gz in this directory
+HISTORY_ARCHIVE_DIR = "database/archive"
+# how often the retention policy runs, in seconds
+HISTORY_RETENTION_INTERVAL = 6 * 60 * 60
+# rows moved per transaction
+HISTORY_ARCHIVE_BATCH = 1000
+
+# /export_history keeps files up to this size in memory before spilling them to a temporary file
+EXPORT_SPOOL_SIZE = 4 * 1024 * 1024
+# rows fetched from the database per round trip while exporting
+EXPORT_BATCH = 1000
+# Telegram rejects documents over 50 MB uploaded by bots
+EXPORT_MAX_SIZE = 50 * 1024 * 1024
 
 user_private_commands = [
     BotCommand(command="start", description="Start the bot"),
@@ -51,11 +134,12 @@ admin_group_commands = [
     BotCommand(command="unmute", description="Lift restriction (reply required)"),
     BotCommand(command="ban", description="Ban user (reply or ID required)"),
     BotCommand(command="unban", description="Unban user (reply or ID required)"),
-    BotCommand(command="addfilter", description="Add word to profanity filter"),
-    BotCommand(command="removefilter", description="Remove word from profanity filter"),
+    BotCommand(command="addfilter", description="Add word to this chat's profanity filter"),
+    BotCommand(command="removefilter", description="Remove word from this chat's profanity filter"),
     BotCommand(command="mute_list", description="View history of mutes"),
     BotCommand(command="ban_list", description="View history of bans"),
     BotCommand(command="warn_list", description="View history of warns"),
+    BotCommand(command="export_history", description="Export moderation history as CSV or JSONL"),
     BotCommand(command="stats", description="View your statistics"),
     BotCommand(command="report", description="Report user (reply and reason requeired)"),
 ]
@@ -82,4 +166,32 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 DB_PATH = BASE_DIR / "database" / "db.sqlite3"
 
-DB_URL = f"sqlite+aiosqlite:///{DB_PATH}"
\ No newline at end of file
+DB_URL = f"sqlite+aiosqlite:///{DB_PATH}"
+
+# PRAGMAs applied to every new SQLite connection, pick one of SQLITE_PROFILES
+SQLITE_PROFILE = "performance"
+
+SQLITE_PROFILES = {
+    # sqlite defaults: rollback journal, synchronous=FULL, no busy timeout
+    "default": {},
+    # WAL lets readers work while a write is in progress; with synchronous=NORMAL
+    # a power loss can drop the last commits but never corrupts the database
+    "performance": {
+        # lets the retention policy return archived pages to the filesystem;
+        # must come before journal_mode and only applies to new databases
+        "auto_vacuum": "INCREMENTAL",
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,  # in KiB when negative, ~64 MB
+        "mmap_size": 268435456,  # 256 MB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,  # ms to wait for a lock instead of failing with "database is locked"
+    },
+    # WAL with an fsync on every commit
+    "durable": {
+        "auto_vacuum": "INCREMENTAL",
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+    },
+}
\ No newline at end of file
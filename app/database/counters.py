@@ -0,0 +1,149 @@
+import asyncio
+
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from config.config import MESSAGE_COUNTER_FLUSH_INTERVAL, MESSAGE_COUNTER_FLUSH_SIZE
+from database.models import User
+
+from loguru import logger
+
+
+class MessageCounterBuffer:
+    """
+    Write-behind buffer for per-user message counters.
+    Increments accumulate in memory per (user_id, chat_id) and are written as one batched
+    upsert every flush_interval seconds, or earlier once flush_size users are pending.
+    """
+
+    def __init__(self, flush_interval: float, flush_size: int):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+
+        # (user_id, chat_id) -> [messages, first seen]
+        self._pending: dict[tuple[int, int], list] = {}
+        # entries of the flush in progress, still counted until it is committed
+        self._flushing: dict[tuple[int, int], list] = {}
+
+        # held while a flush writes, readers take it to see the database and the buffer consistently
+        self.lock = asyncio.Lock()
+
+        self._session_pool: async_sessionmaker | None = None
+        self._flush_task: asyncio.Task | None = None
+        self._loop_task: asyncio.Task | None = None
+
+
+    def start(self, session_pool: async_sessionmaker):
+        self._session_pool = session_pool
+
+        if not self._loop_task:
+            self._loop_task = asyncio.create_task(self._flush_loop())
+
+
+    async def shutdown(self):
+        """
+        Stops the periodic flush and writes out every pending count.
+        """
+
+        if self._loop_task:
+            self._loop_task.cancel()
+            self._loop_task = None
+
+        await self.flush()
+
+
+    def add(self, user_id: int, chat_id: int):
+        entry = self._pending.get((user_id, chat_id))
+
+        if entry:
+            entry[0] += 1
+        else:
+            self._pending[(user_id, chat_id)] = [1, datetime.now()]
+
+        if len(self._pending) >= self.flush_size and not self._flush_task and self._session_pool:
+            self._flush_task = asyncio.create_task(self.flush())
+            self._flush_task.add_done_callback(lambda _: setattr(self, "_flush_task", None))
+
+
+    def pending(self, user_id: int, chat_id: int) -> tuple[int, datetime | None]:
+        """
+        Returns the messages of a user not yet written to the database and when the first was seen.
+        """
+
+        count, first_seen = 0, None
+
+        for entries in (self._flushing, self._pending):
+            entry = entries.get((user_id, chat_id))
+
+            if entry:
+                count += entry[0]
+                first_seen = first_seen or entry[1]
+
+        return count, first_seen
+
+
+    async def flush(self):
+        """
+        Writes all pending counts in one transaction.
+        On failure they are put back into the buffer for the next attempt.
+        """
+
+        async with self.lock:
+            if not self._pending or not self._session_pool:
+                return
+
+            self._flushing, self._pending = self._pending, {}
+
+            stmt = insert(User)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[User.id, User.chat_id],
+                set_={
+                    "count_messages": func.coalesce(User.count_messages, 0)
+                    + stmt.excluded.count_messages,
+                    "join_date": func.coalesce(User.join_date, stmt.excluded.join_date),
+                    "last_seen": stmt.excluded.last_seen,
+                },
+            )
+
+            now = datetime.now()
+            rows = [
+                {
+                    "id": user_id,
+                    "chat_id": chat_id,
+                    "count_messages": count,
+                    "join_date": first_seen,
+                    "last_seen": now,
+                }
+                for (user_id, chat_id), (count, first_seen) in self._flushing.items()
+            ]
+
+            try:
+                async with self._session_pool() as session:
+                    await session.execute(stmt, rows)
+                    await session.commit()
+
+            except Exception:
+                logger.exception(f"Failed to flush message counters of {len(rows)} users")
+
+                for key, (count, first_seen) in self._flushing.items():
+                    entry = self._pending.setdefault(key, [0, first_seen])
+                    entry[0] += count
+                    entry[1] = min(entry[1], first_seen)
+
+            finally:
+                self._flushing = {}
+
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+message_counter = MessageCounterBuffer(
+    flush_interval=MESSAGE_COUNTER_FLUSH_INTERVAL,
+    flush_size=MESSAGE_COUNTER_FLUSH_SIZE,
+)
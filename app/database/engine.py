@@ -1,15 +1,53 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from typing import Any, Callable
 
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
+
+from database.migrations import add_missing_columns, migrate_legacy_history
 from database.models import Base
 
-from config.config import DB_URL
+from config.config import DB_URL, SQLITE_PROFILE, SQLITE_PROFILES
+
+
+def apply_sqlite_profile(engine: AsyncEngine, pragmas: dict):
+    """
+    Runs the PRAGMAs of a profile on every new connection of the engine.
+    """
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
 
 engine = create_async_engine(DB_URL, echo=False)
+apply_sqlite_profile(engine, SQLITE_PROFILES[SQLITE_PROFILE])
 
 session_maker = async_sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False
 )
 
+
+def after_commit(session: AsyncSession, callback: Callable[[], Any]):
+    """
+    Runs a callback once DbSessionMiddleware has committed the session of the current update,
+    e.g. to drop caches of the rows it changed. Dropped if the update is rolled back.
+    """
+
+    session.info.setdefault("after_commit", []).append(callback)
+
+def _create_indexes(conn):
+    # create_all only adds indexes together with new tables
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
 async def create_db():
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(add_missing_columns)
+        await conn.run_sync(migrate_legacy_history)
+        await conn.run_sync(_create_indexes)
@@ -0,0 +1,252 @@
+import asyncio
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from aiogram.types import ChatMember
+
+from sqlalchemy import delete, tuple_
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from config.config import (
+    MEMBER_STATUS_CACHE_SIZE,
+    MEMBER_STATUS_FLUSH_INTERVAL,
+    MEMBER_STATUS_TTL,
+)
+from database.models import ChatMemberStatus
+
+from loguru import logger
+
+
+@dataclass(frozen=True)
+class MemberStatus:
+    status: str
+    can_send_messages: bool
+    until_date: datetime | None
+    updated_at: datetime
+
+
+    def is_fresh(self, ttl: timedelta, now: datetime) -> bool:
+        # a restriction that has run out may have been lifted without an update
+        return self.updated_at + ttl > now and (self.until_date is None or self.until_date > now)
+
+
+def _local_time(value: datetime | None) -> datetime | None:
+    """
+    Converts a Telegram date to the naive local time used in the database; 0 means "forever".
+    """
+
+    if value is None or value.timestamp() <= 0:
+        return None
+
+    return datetime.fromtimestamp(value.timestamp())
+
+
+class MemberStatusMirror:
+    """
+    Local copy of chat member statuses, so restriction checks need no get_chat_member call.
+    Statuses come from chat_member updates and from the bot's own restrict and ban calls.
+    They are served from an in-memory LRU backed by the chat_member_status table,
+    and changes are written to the table in batches every flush_interval seconds.
+    """
+
+    def __init__(self, ttl: float, size: int, flush_interval: float):
+        self.ttl = timedelta(seconds=ttl)
+        self.size = size
+        self.flush_interval = flush_interval
+
+        self._cache: OrderedDict[tuple[int, int], MemberStatus] = OrderedDict()
+
+        # (chat_id, user_id) -> status to write, None to delete
+        self._pending: dict[tuple[int, int], MemberStatus | None] = {}
+        # entries of the flush in progress, still served until it is committed
+        self._flushing: dict[tuple[int, int], MemberStatus | None] = {}
+
+        self._lock = asyncio.Lock()
+
+        self._session_pool: async_sessionmaker | None = None
+        self._loop_task: asyncio.Task | None = None
+
+
+    def start(self, session_pool: async_sessionmaker):
+        self._session_pool = session_pool
+
+        if not self._loop_task:
+            self._loop_task = asyncio.create_task(self._flush_loop())
+
+
+    async def shutdown(self):
+        if self._loop_task:
+            self._loop_task.cancel()
+            self._loop_task = None
+
+        await self.flush()
+
+
+    def _remember(self, key: tuple[int, int], entry: MemberStatus):
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+
+        while len(self._cache) > self.size:
+            self._cache.popitem(last=False)
+
+
+    def record(
+        self,
+        chat_id: int,
+        user_id: int,
+        status: str,
+        can_send_messages: bool = True,
+        until_date: datetime | None = None,
+    ) -> MemberStatus:
+        entry = MemberStatus(status, can_send_messages, until_date, datetime.now())
+
+        self._remember((chat_id, user_id), entry)
+        self._pending[(chat_id, user_id)] = entry
+
+        return entry
+
+
+    def record_member(self, chat_id: int, member: ChatMember) -> MemberStatus:
+        """
+        Records a ChatMember as returned by the API or carried by a chat_member update.
+        """
+
+        return self.record(
+            chat_id,
+            member.user.id,
+            member.status,
+            getattr(member, "can_send_messages", True),
+            _local_time(getattr(member, "until_date", None)),
+        )
+
+
+    def forget(self, chat_id: int, user_id: int):
+        """
+        Drops a status the bot can no longer be sure of, e.g. after lifting a restriction,
+        so the next check asks the API or waits for the chat_member update.
+        """
+
+        self._cache.pop((chat_id, user_id), None)
+        self._pending[(chat_id, user_id)] = None
+
+
+    async def _load(self, key: tuple[int, int]) -> MemberStatus | None:
+        if not self._session_pool:
+            return None
+
+        async with self._session_pool() as session:
+            row = await session.get(ChatMemberStatus, key)
+
+        # a status recorded while the row was read is newer than the row
+        if key in self._pending:
+            return self._pending[key]
+        if key in self._cache:
+            return self._cache[key]
+
+        if not row:
+            return None
+
+        entry = MemberStatus(row.status, row.can_send_messages, row.until_date, row.updated_at)
+        self._remember(key, entry)
+
+        return entry
+
+
+    async def get(self, chat_id: int, user_id: int) -> MemberStatus | None:
+        """
+        Returns the mirrored status of a member, or None if it is unknown or stale.
+        """
+
+        key = (chat_id, user_id)
+
+        for entries in (self._pending, self._flushing):
+            if key in entries:
+                entry = entries[key]
+                break
+        else:
+            entry = self._cache.get(key)
+
+            if entry:
+                self._cache.move_to_end(key)
+            else:
+                entry = await self._load(key)
+
+        if entry and entry.is_fresh(self.ttl, datetime.now()):
+            return entry
+
+        return None
+
+
+    async def flush(self):
+        """
+        Writes all pending status changes in one transaction.
+        On failure they are put back unless a newer change replaced them meanwhile.
+        """
+
+        async with self._lock:
+            if not self._pending or not self._session_pool:
+                return
+
+            self._flushing, self._pending = self._pending, {}
+
+            rows = [
+                {
+                    "chat_id": chat_id,
+                    "user_id": user_id,
+                    "status": entry.status,
+                    "can_send_messages": entry.can_send_messages,
+                    "until_date": entry.until_date,
+                    "updated_at": entry.updated_at,
+                }
+                for (chat_id, user_id), entry in self._flushing.items()
+                if entry
+            ]
+            removed = [key for key, entry in self._flushing.items() if not entry]
+
+            stmt = insert(ChatMemberStatus)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[ChatMemberStatus.chat_id, ChatMemberStatus.user_id],
+                set_={
+                    name: stmt.excluded[name]
+                    for name in ("status", "can_send_messages", "until_date", "updated_at")
+                },
+            )
+
+            try:
+                async with self._session_pool() as session:
+                    if rows:
+                        await session.execute(stmt, rows)
+
+                    if removed:
+                        await session.execute(
+                            delete(ChatMemberStatus).where(
+                                tuple_(ChatMemberStatus.chat_id, ChatMemberStatus.user_id).in_(removed)
+                            )
+                        )
+
+                    await session.commit()
+
+            except Exception:
+                logger.exception(f"Failed to flush {len(self._flushing)} member statuses")
+
+                for key, entry in self._flushing.items():
+                    self._pending.setdefault(key, entry)
+
+            finally:
+                self._flushing = {}
+
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+member_status = MemberStatusMirror(
+    ttl=MEMBER_STATUS_TTL,
+    size=MEMBER_STATUS_CACHE_SIZE,
+    flush_interval=MEMBER_STATUS_FLUSH_INTERVAL,
+)
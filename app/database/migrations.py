@@ -0,0 +1,142 @@
+from datetime import datetime
+
+from sqlalchemy import Connection, MetaData, Table, inspect, select, update
+from sqlalchemy.dialects.sqlite import insert
+
+from database.models import Base, ModerationAction, ModerationEvent, User, UserName
+
+from loguru import logger
+
+
+# history tables replaced by moderation_event
+_LEGACY_HISTORY_TABLES = {
+    "ban_history": ModerationAction.BAN,
+    "mute_history": ModerationAction.MUTE,
+    "warn_history": ModerationAction.WARN,
+}
+
+_BATCH_SIZE = 1000
+
+
+def _legacy_duration(duration: str | None, time: int) -> int | None:
+    """
+    Converts the old "until %Y-%m-%d %H:%M" text into seconds; "permanent" and unknown values become None.
+    """
+
+    if not duration or not duration.startswith("until "):
+        return None
+
+    try:
+        until = datetime.strptime(duration.removeprefix("until "), "%Y-%m-%d %H:%M")
+    except ValueError:
+        return None
+
+    return max(0, int(until.timestamp()) - time)
+
+
+def _copy_legacy_table(conn: Connection, table: Table, action: ModerationAction, names: dict) -> int:
+    events = []
+    copied = 0
+
+    rows = conn.execution_options(yield_per=_BATCH_SIZE).execute(select(table).order_by(table.c.id))
+
+    for row in rows:
+        if row.time is None:
+            continue
+
+        time = int(row.time.timestamp())
+
+        events.append({
+            "chat_id": row.chat_id,
+            "user_id": row.user_id,
+            "action": int(action),
+            "time": time,
+            "duration": _legacy_duration(row.duration, time) if action != ModerationAction.WARN else None,
+            "reason": row.reason if action != ModerationAction.WARN else None,
+        })
+
+        # keep the latest name of every user
+        if row.name and names.get(row.user_id, (-1,))[0] <= time:
+            names[row.user_id] = (time, row.name)
+
+        if len(events) >= _BATCH_SIZE:
+            conn.execute(insert(ModerationEvent), events)
+            copied += len(events)
+            events.clear()
+
+    if events:
+        conn.execute(insert(ModerationEvent), events)
+        copied += len(events)
+
+    return copied
+
+
+def migrate_legacy_history(conn: Connection):
+    """
+    One-shot migration of ban_history, mute_history and warn_history into moderation_event.
+    Each old table is dropped once its rows are copied, so later runs do nothing.
+    Runs inside the caller's transaction: a failed migration leaves the old tables untouched.
+    """
+
+    existing = set(inspect(conn).get_table_names())
+    legacy = [name for name in _LEGACY_HISTORY_TABLES if name in existing]
+
+    if not legacy:
+        return
+
+    names: dict[int, tuple[int, str]] = {}
+
+    for name in legacy:
+        table = Table(name, MetaData(), autoload_with=conn)
+        copied = _copy_legacy_table(conn, table, _LEGACY_HISTORY_TABLES[name], names)
+        table.drop(conn)
+
+        logger.info(f"Migrated {copied} rows from {name} to moderation_event")
+
+    if names:
+        stmt = insert(UserName)
+        stmt = stmt.on_conflict_do_nothing(index_elements=[UserName.id])
+
+        conn.execute(stmt, [{"id": user_id, "name": name} for user_id, (_, name) in names.items()])
+
+
+def add_missing_columns(conn: Connection):
+    """
+    Adds nullable columns that were introduced after a table was created;
+    create_all never alters existing tables.
+    """
+
+    inspector = inspect(conn)
+    quote = conn.dialect.identifier_preparer.quote
+    existing_tables = set(inspector.get_table_names())
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.exec_driver_sql(
+                f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"
+            )
+            logger.info(f"Added column {table.name}.{column.name}")
+
+            if column is User.__table__.c.last_seen:
+                # users from before the column existed count as seen now
+                conn.execute(
+                    update(User).values(last_seen=datetime.now())
+                )
+
+
+if __name__ == "__main__":
+    # runs automatically on startup; python -m database.migrations migrates without starting the bot
+    import asyncio
+
+    from database.engine import create_db
+
+    asyncio.run(create_db())
@@ -1,5 +1,7 @@
 from datetime import datetime
+from enum import IntEnum
 
+from sqlalchemy import Index, SmallInteger
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -27,6 +29,9 @@ class User(Base):
 
     join_date: Mapped[datetime] = mapped_column(nullable=True)
 
+    # time of the last counted message, used by the retention policy
+    last_seen: Mapped[datetime] = mapped_column(nullable=True)
+
 
 
 class ChatConfig(Base):
@@ -35,58 +40,100 @@ class ChatConfig(Base):
     group_id: Mapped[int] = mapped_column(primary_key=True)
     log_chat_id: Mapped[int] = mapped_column(nullable=True)
 
+    # per-chat overrides, None falls back to the defaults from config
+    max_warns: Mapped[int] = mapped_column(nullable=True)
+    # mute durations in seconds for the 1st, 2nd, ... auto-mute, comma separated
+    mute_schedule: Mapped[str] = mapped_column(nullable=True)
+    filter_links: Mapped[bool] = mapped_column(nullable=True)
+    filter_bad_words: Mapped[bool] = mapped_column(nullable=True)
 
 
-class BanHistory(Base):
-    __tablename__ = "ban_history"
 
-    id: Mapped[int] = mapped_column(primary_key=True)
+class ChatFilterWord(Base):
+    __tablename__ = "chat_filter_word"
 
-    user_id: Mapped[int] = mapped_column()
-    chat_id: Mapped[int] = mapped_column()
+    group_id: Mapped[int] = mapped_column(primary_key=True)
+    word: Mapped[str] = mapped_column(primary_key=True)
 
-    time: Mapped[datetime] = mapped_column(nullable=True)
+    # True: the word is excluded from the global list for this chat only
+    is_exempt: Mapped[bool] = mapped_column(default=False)
 
-    name: Mapped[str] = mapped_column(nullable=True)
 
-    status: Mapped[str] = mapped_column(nullable=True)
 
-    duration: Mapped[str] = mapped_column(nullable=True)
+class ModerationAction(IntEnum):
+    BAN = 1
+    MUTE = 2
+    WARN = 3
 
-    reason: Mapped[str] = mapped_column(nullable=True)
 
 
-
-class MuteHistory(Base):
-    __tablename__ = "mute_history"
+class ModerationEvent(Base):
+    __tablename__ = "moderation_event"
+    __table_args__ = (
+        Index("ix_moderation_event_chat_action_time", "chat_id", "action", "time"),
+        Index("ix_moderation_event_user_chat", "user_id", "chat_id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
-    user_id: Mapped[int] = mapped_column()
     chat_id: Mapped[int] = mapped_column()
+    user_id: Mapped[int] = mapped_column()
 
-    time: Mapped[datetime] = mapped_column(nullable=True)
-
-    name: Mapped[str] = mapped_column(nullable=True)
+    # ModerationAction
+    action: Mapped[int] = mapped_column(SmallInteger)
 
-    status: Mapped[str] = mapped_column(nullable=True)
+    # unix time, in seconds
+    time: Mapped[int] = mapped_column()
 
-    duration: Mapped[str] = mapped_column(nullable=True)
+    # seconds the restriction lasts, None for permanent restrictions and warnings
+    duration: Mapped[int] = mapped_column(nullable=True)
 
     reason: Mapped[str] = mapped_column(nullable=True)
 
 
 
-class WarnHistory(Base):
-    __tablename__ = "warn_history"
+class UserName(Base):
+    __tablename__ = "user_name"
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
-    user_id: Mapped[int] = mapped_column()
-    chat_id: Mapped[int] = mapped_column()
+    # latest full name seen for the user, shown in history lists
+    name: Mapped[str] = mapped_column()
+
+
+
+# last known membership status of a user in a chat, see database.members
+class ChatMemberStatus(Base):
+    __tablename__ = "chat_member_status"
+
+    chat_id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(primary_key=True)
 
-    time: Mapped[datetime] = mapped_column(nullable=True)
+    # "creator", "administrator", "member", "restricted", "left" or "kicked"
+    status: Mapped[str] = mapped_column()
+    can_send_messages: Mapped[bool] = mapped_column(default=True)
 
-    name: Mapped[str] = mapped_column(nullable=True)
+    # end of a restriction or ban, None while it is permanent or for other statuses
+    until_date: Mapped[datetime] = mapped_column(nullable=True)
 
-    status: Mapped[str] = mapped_column(nullable=True)
\ No newline at end of file
+    updated_at: Mapped[datetime] = mapped_column()
+
+
+
+# current username and full name of every user seen in a chat, see database.usernames
+class ChatUsername(Base):
+    __tablename__ = "chat_username"
+    __table_args__ = (
+        Index("ix_chat_username_chat_username", "chat_id", "username", unique=True),
+    )
+
+    chat_id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(primary_key=True)
+
+    # lowercase, without the leading @; None for users without a username
+    username: Mapped[str] = mapped_column(nullable=True)
+    full_name: Mapped[str] = mapped_column()
+    # first_name and is_bot are None in rows written before they existed; full_name stands in then
+    first_name: Mapped[str] = mapped_column(nullable=True)
+    last_name: Mapped[str] = mapped_column(nullable=True)
+    is_bot: Mapped[bool] = mapped_column(nullable=True)
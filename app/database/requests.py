@@ -1,24 +1,117 @@
 from datetime import datetime
 
 from config.config import MAX_WARNS
-from database.models import BanHistory, MuteHistory, User, ChatConfig, WarnHistory
-
+from database.counters import message_counter
+from database.models import (
+    ChatConfig,
+    ChatFilterWord,
+    ModerationAction,
+    ModerationEvent,
+    User,
+    UserName,
+)
+
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_
+from sqlalchemy import Integer, bindparam, case, select, func, or_, tuple_, update
 
 from loguru import logger
 
 
+def _user_upsert(insert_values: dict, update_values: dict):
+    """
+    Builds an INSERT ... ON CONFLICT DO UPDATE for a user row, returning its counters.
+    update_values are evaluated against the existing row, so concurrent updates never race.
+    The statement is built once and run with user_id and chat_id parameters.
+    """
+
+    return (
+        insert(User)
+        .values(id=bindparam("user_id"), chat_id=bindparam("chat_id"), **insert_values)
+        .on_conflict_do_update(index_elements=[User.id, User.chat_id], set_=update_values)
+        .returning(User.count_warns, User.count_mutes, User.count_bans)
+    )
+
+
+_warns = func.coalesce(User.count_warns, 0) + 1
+_max_warns = bindparam("max_warns", type_=Integer)
+_warn_limit_reached = _warns >= _max_warns
+
+# a new user's first warning may already reach the limit when the chat allows a single warning
+_first_warn_reached = _max_warns <= 1
+
+_ADD_WARN = _user_upsert(
+    insert_values={
+        "count_warns": case((_first_warn_reached, 0), else_=1),
+        "count_mutes": case((_first_warn_reached, 1), else_=0),
+        "is_muted": _first_warn_reached,
+    },
+    update_values={
+        "count_warns": case((_warn_limit_reached, 0), else_=_warns),
+        "count_mutes": case(
+            (_warn_limit_reached, func.coalesce(User.count_mutes, 0) + 1),
+            else_=User.count_mutes,
+        ),
+        "is_muted": case((_warn_limit_reached, True), else_=User.is_muted),
+    },
+)
+
+_ADD_MUTE = _user_upsert(
+    insert_values={"count_mutes": 1, "is_muted": True, "mute_duration": bindparam("until_date")},
+    update_values={
+        "count_mutes": func.coalesce(User.count_mutes, 0) + 1,
+        "is_muted": True,
+        "mute_duration": bindparam("until_date"),
+    },
+)
+
+_ADD_BAN = _user_upsert(
+    insert_values={"count_bans": 1, "is_banned": True, "ban_duration": bindparam("until_date")},
+    update_values={
+        "count_bans": func.coalesce(User.count_bans, 0) + 1,
+        "is_banned": True,
+        "ban_duration": bindparam("until_date"),
+    },
+)
+
+_CREATE_USER = (
+    insert(User)
+    .values(id=bindparam("user_id"), chat_id=bindparam("chat_id"), join_date=bindparam("join_date"))
+    .on_conflict_do_nothing(index_elements=[User.id, User.chat_id])
+    .returning(User.id)
+)
+
+_set_user_name = insert(UserName).values(id=bindparam("user_id"), name=bindparam("name"))
+_SET_USER_NAME = _set_user_name.on_conflict_do_update(
+    index_elements=[UserName.id], set_={"name": _set_user_name.excluded.name}
+)
+
+_ENSURE_USER = (
+    insert(User)
+    .values(id=bindparam("user_id"), chat_id=bindparam("chat_id"))
+    .on_conflict_do_nothing(index_elements=[User.id, User.chat_id])
+)
+
+
+async def _execute(session: AsyncSession, stmt, **params):
+    """
+    Runs a prebuilt statement on the session's connection, skipping the ORM execution path.
+    """
+
+    connection = await session.connection()
+    return await connection.execute(stmt, params)
+
+
 async def create_user(session: AsyncSession, user_id: int | None, chat_id: int | None):
     """
     Ensures a user exists in the database. Creates a new record if not found.
     """
-    
-    user = await session.get(User, (user_id, chat_id))
 
-    if not user:
-        new_user = User(id=user_id, chat_id=chat_id, join_date=datetime.now())
-        session.add(new_user)
+    result = await _execute(
+        session, _CREATE_USER, user_id=user_id, chat_id=chat_id, join_date=datetime.now()
+    )
+
+    if result.first():
         logger.info(f"New user {user_id} in chat {chat_id} created in database")
 
 
@@ -26,9 +119,13 @@ async def get_user_stats(session: AsyncSession, user_id: int | None, chat_id: in
     """
     Returns all user statistics for being in the chat.
     If the user doesn't exist, returns default zero stats.
+    Messages not yet flushed by the counter buffer are included.
     """
 
-    stats = await session.get(User, (user_id, chat_id))
+    # a flush between the two reads would count its messages twice or not at all
+    async with message_counter.lock:
+        stats = await session.get(User, (user_id, chat_id), populate_existing=True)
+        pending, first_seen = message_counter.pending(user_id, chat_id)
 
     if not stats:
         return {
@@ -36,8 +133,8 @@ async def get_user_stats(session: AsyncSession, user_id: int | None, chat_id: in
             'count_mutes': 0,
             'count_bans': 0,
             'count_warns': 0,
-            'join_date': 'N/A',
-            'count_messages': 0
+            'join_date': first_seen.strftime('%Y-%m-%d %H:%M') if first_seen else 'N/A',
+            'count_messages': pending
         }
 
     return {
@@ -46,33 +143,56 @@ async def get_user_stats(session: AsyncSession, user_id: int | None, chat_id: in
         'count_bans': stats.count_bans or 0,
         'count_warns': stats.count_warns or 0,
         'join_date': stats.join_date.strftime('%Y-%m-%d %H:%M') if stats.join_date else 'N/A',
-        'count_messages': stats.count_messages or 0
+        'count_messages': (stats.count_messages or 0) + pending
     }
 
 
-async def add_warn(session: AsyncSession, user_id: int, chat_id: int):
+async def add_warn(session: AsyncSession, user_id: int, chat_id: int, max_warns: int = MAX_WARNS):
     """
     Increments the warning count for a user. Triggers mute status if limit reached.
     """
 
-    user = await session.get(User, (user_id, chat_id))
+    result = await _execute(
+        session, _ADD_WARN, user_id=user_id, chat_id=chat_id, max_warns=max_warns
+    )
+    count_warns, count_mutes, _ = result.one()
 
-    if not user:
-        user = User(id=user_id, chat_id=chat_id)
-        session.add(user)
+    # the counter was reset to 0 when the limit was reached
+    current_warns = count_warns or max_warns
+    mutes = count_mutes or 0
 
-    user.count_warns = (user.count_warns or 0) + 1
+    return current_warns, mutes
 
-    current_warns = user.count_warns
 
-    if user.count_warns >= MAX_WARNS:
-        user.count_warns = 0
-        user.count_mutes = (user.count_mutes or 0) + 1
-        user.is_muted = True
+async def add_moderation_event(
+    session: AsyncSession,
+    user_id: int,
+    chat_id: int,
+    action: ModerationAction,
+    time: datetime,
+    name: str,
+    until_date: datetime | None = None,
+    reason: str | None = None,
+):
+    """
+    Records a moderation action in the history and remembers the user's current name.
+    """
 
-    mutes = user.count_mutes or 0
+    epoch = int(time.timestamp())
 
-    return current_warns, mutes
+    session.add(
+        ModerationEvent(
+            chat_id=chat_id,
+            user_id=user_id,
+            action=action,
+            time=epoch,
+            duration=int(until_date.timestamp()) - epoch if until_date else None,
+            reason=reason,
+        )
+    )
+
+    if name:
+        await _execute(session, _SET_USER_NAME, user_id=user_id, name=name)
 
 
 async def add_mute(
@@ -81,8 +201,6 @@ async def add_mute(
     chat_id: int,
     time: datetime,
     name: str,
-    status: str,
-    duration_str: str,
     until_date: datetime | None,
     reason: str = None,
 ):
@@ -90,26 +208,11 @@ async def add_mute(
     Logs a new mute action to the database history.
     """
 
-    user = await session.get(User, (user_id, chat_id))
-    if not user:
-        user = User(id=user_id, chat_id=chat_id)
-        session.add(user)
-
-    user.count_mutes = (user.count_mutes or 0) + 1
-    user.is_muted = True
-    user.mute_duration = until_date
-
-    new_record = MuteHistory(
-        user_id=user_id,
-        chat_id=chat_id,
-        time=time,
-        name=name,
-        status=status,
-        duration=duration_str,
-        reason=reason,
+    await _execute(session, _ADD_MUTE, user_id=user_id, chat_id=chat_id, until_date=until_date)
+    await add_moderation_event(
+        session, user_id, chat_id, ModerationAction.MUTE, time, name, until_date, reason
     )
 
-    session.add(new_record)
     logger.success(f"Mute record added for user {user_id} in chat {chat_id}")
 
 
@@ -119,8 +222,6 @@ async def add_ban(
     chat_id: int,
     time: datetime,
     name: str,
-    status: str,
-    duration: str,
     until_date: datetime | None,
     reason: str = None,
 ):
@@ -128,26 +229,11 @@ async def add_ban(
     Logs a new ban action to the database history.
     """
 
-    user = await session.get(User, (user_id, chat_id))
-    if not user:
-        user = User(id=user_id, chat_id=chat_id)
-        session.add(user)
-
-    user.count_bans = (user.count_bans or 0) + 1
-    user.is_banned = True
-    user.ban_duration = until_date
-
-    new_record = BanHistory(
-        user_id=user_id,
-        chat_id=chat_id,
-        time=time,
-        name=name,
-        status=status,
-        duration=duration,
-        reason=reason,
+    await _execute(session, _ADD_BAN, user_id=user_id, chat_id=chat_id, until_date=until_date)
+    await add_moderation_event(
+        session, user_id, chat_id, ModerationAction.BAN, time, name, until_date, reason
     )
 
-    session.add(new_record)
     logger.success(f"Ban record added for user {user_id} in chat {chat_id}")
 
 
@@ -157,26 +243,14 @@ async def add_warn_log(
     chat_id: int,
     time: datetime,
     name: str,
-    status: str,
 ):
     """
     Logs a new warn action to the database history.
     """
 
-    user = await session.get(User, (user_id, chat_id))
-    if not user:
-        user = User(id=user_id, chat_id=chat_id)
-        session.add(user)
+    await _execute(session, _ENSURE_USER, user_id=user_id, chat_id=chat_id)
+    await add_moderation_event(session, user_id, chat_id, ModerationAction.WARN, time, name)
 
-    new_record = WarnHistory(
-        user_id=user_id,
-        chat_id=chat_id,
-        time=time,
-        name=name,
-        status=status,
-    )
-
-    session.add(new_record)
     logger.success(f"Warn record added for user {user_id} in chat {chat_id}")
 
 
@@ -185,11 +259,13 @@ async def unmute_user(session: AsyncSession, user_id: int, chat_id: int):
     Updates the user's status in the database to unmuted.
     """
 
-    user = await session.get(User, (user_id, chat_id))
-    if user:
-        user.is_muted = False
-        user.mute_duration = None
+    result = await session.execute(
+        update(User)
+        .where(User.id == user_id, User.chat_id == chat_id)
+        .values(is_muted=False, mute_duration=None)
+    )
 
+    if result.rowcount:
         logger.info(f"User {user_id} in chat {chat_id} unmuted in database")
 
 
@@ -198,11 +274,13 @@ async def unban_user(session: AsyncSession, user_id: int, chat_id: int):
     Updates the user's status in the database to unbanned.
     """
 
-    user = await session.get(User, (user_id, chat_id))
-    if user:
-        user.is_banned = False
-        user.ban_duration = None
+    result = await session.execute(
+        update(User)
+        .where(User.id == user_id, User.chat_id == chat_id)
+        .values(is_banned=False, ban_duration=None)
+    )
 
+    if result.rowcount:
         logger.info(f"User {user_id} in chat {chat_id} unbanned in database")
 
 
@@ -211,13 +289,19 @@ async def unwarn_user(session: AsyncSession, user_id: int, chat_id: int):
     Decrements the user's warning count in the database.
     """
 
-    user = await session.get(User, (user_id, chat_id))
-    if not user or user.count_warns <= 0:
+    result = await session.execute(
+        update(User)
+        .where(User.id == user_id, User.chat_id == chat_id, User.count_warns > 0)
+        .values(count_warns=User.count_warns - 1)
+        .returning(User.count_warns)
+    )
+
+    count_warns = result.scalar()
+    if count_warns is None:
         return -1
 
-    user.count_warns -= 1
     logger.info(f"User {user_id} in chat {chat_id} -1 warn in database")
-    return user.count_warns
+    return count_warns
 
 
 async def set_log_chat(session: AsyncSession, group_id, log_chat_id):
@@ -241,51 +325,174 @@ async def set_log_chat(session: AsyncSession, group_id, log_chat_id):
 async def unset_log_chat(session: AsyncSession, group_id):
     """
     Removes the log chat configuration for a specific group.
+    The other settings of the group are kept.
     """
 
     config = await session.get(ChatConfig, group_id)
 
-    if config:
-        await session.delete(config)
-
-    else:
+    if not config or config.log_chat_id is None:
         raise ValueError("Log chat not configured")
 
+    config.log_chat_id = None
+
     logger.success(f"Log channel for group {group_id} unset")
 
 
-async def get_log_chat(session: AsyncSession, group_id):
+async def get_chat_filter_words(session: AsyncSession, group_id):
     """
-    Retrieves the configured admin log channel ID for a specific group.
+    Returns the words added to and exempted from the profanity filter of a specific group.
     """
 
-    config = await session.get(ChatConfig, group_id)
-    return config.log_chat_id if config else None
+    result = await session.execute(
+        select(ChatFilterWord).where(ChatFilterWord.group_id == group_id)
+    )
+
+    additions, exemptions = [], []
+    for record in result.scalars():
+        (exemptions if record.is_exempt else additions).append(record.word)
+
+    return additions, exemptions
+
+
+async def set_chat_filter_word(session: AsyncSession, group_id, word: str, is_exempt: bool):
+    """
+    Adds a word to the filter of a specific group, or exempts it from the global list there.
+    """
+
+    record = await session.get(ChatFilterWord, (group_id, word))
+
+    if not record:
+        record = ChatFilterWord(group_id=group_id, word=word, is_exempt=is_exempt)
+        session.add(record)
+    else:
+        record.is_exempt = is_exempt
+
+    logger.info(f"Filter word {word!r} in group {group_id} set (exempt: {is_exempt})")
+
+
+async def delete_chat_filter_word(session: AsyncSession, group_id, word: str):
+    """
+    Removes a per-group filter entry, restoring the global behaviour for that word.
+    """
+
+    record = await session.get(ChatFilterWord, (group_id, word))
+
+    if record:
+        await session.delete(record)
+        logger.info(f"Filter word {word!r} in group {group_id} deleted")
+
+
+# restriction whose active state the "current" lists check
+_ACTIVE_STATUS = {
+    ModerationAction.BAN: (User.is_banned, User.ban_duration),
+    ModerationAction.MUTE: (User.is_muted, User.mute_duration),
+}
+
+
+def _history_query(query, action: ModerationAction, chat_id: int, current: bool):
+    """
+    Restricts a history query to one action in one chat and, optionally, to currently active restrictions.
+    """
+
+    query = query.where(ModerationEvent.chat_id == chat_id, ModerationEvent.action == action)
+
+    if current and action in _ACTIVE_STATUS:
+        status_field, duration_field = _ACTIVE_STATUS[action]
+
+        query = query.join(
+            User, (ModerationEvent.user_id == User.id) & (ModerationEvent.chat_id == User.chat_id)
+        ).where(
+            status_field == True,
+            or_(duration_field == None, duration_field > datetime.now()),
+        )
+
+    return query
 
 
 async def get_history_list(
     session: AsyncSession,
-    model,
+    action: ModerationAction,
+    chat_id: int,
     current: bool,
-    status: str | None,
+    limit: int,
+    cursor: tuple[int, int] | None = None,
+    backward: bool = False,
 ):
     """
-    Retrieves a list of records from the specified history model.
+    Retrieves one page of history events with the users' names, newest first.
+    cursor is the (time, id) of the event the page continues from:
+    the page holds the events after it, or the events before it when backward is set.
     Optionally filters for currently active restrictions.
     """
 
-    query = select(model)
+    query = _history_query(
+        select(ModerationEvent, UserName.name).outerjoin(UserName, UserName.id == ModerationEvent.user_id),
+        action,
+        chat_id,
+        current,
+    )
+    key = tuple_(ModerationEvent.time, ModerationEvent.id)
 
-    if current and status:
-        duration_field = (
-            User.mute_duration if status == "is_muted" else User.ban_duration
-        )
-        query = query.join(
-            User, (model.user_id == User.id) & (model.chat_id == User.chat_id)
-        ).where(
-            getattr(User, status) == True,
-            or_(duration_field == None, duration_field > datetime.now()),
+    if cursor:
+        query = query.where(key > tuple_(*cursor) if backward else key < tuple_(*cursor))
+
+    if backward:
+        query = query.order_by(ModerationEvent.time.asc(), ModerationEvent.id.asc())
+    else:
+        query = query.order_by(ModerationEvent.time.desc(), ModerationEvent.id.desc())
+
+    result = await session.execute(query.limit(limit))
+    records = result.all()
+
+    return records[::-1] if backward else records
+
+
+async def count_history(
+    session: AsyncSession,
+    action: ModerationAction,
+    chat_id: int,
+    current: bool,
+) -> int:
+    """
+    Counts the events get_history_list pages through.
+    """
+
+    query = _history_query(select(func.count(ModerationEvent.id)), action, chat_id, current)
+    return await session.scalar(query)
+
+
+async def stream_history(
+    session: AsyncSession,
+    chat_id: int,
+    action: ModerationAction | None = None,
+    batch_size: int = 1000,
+):
+    """
+    Yields the history events of a chat in batches of rows, oldest first, with the users' names.
+    The result is read through a cursor batch_size rows at a time, never loaded as a whole.
+    """
+
+    query = (
+        select(
+            ModerationEvent.id,
+            ModerationEvent.user_id,
+            UserName.name,
+            ModerationEvent.action,
+            ModerationEvent.time,
+            ModerationEvent.duration,
+            ModerationEvent.reason,
         )
+        .outerjoin(UserName, UserName.id == ModerationEvent.user_id)
+        .where(ModerationEvent.chat_id == chat_id)
+    )
+
+    if action is not None:
+        query = query.where(ModerationEvent.action == action)
+
+    # ids grow with time, so the primary key order needs no sort over the whole chat
+    query = query.order_by(ModerationEvent.id).execution_options(yield_per=batch_size)
+
+    result = await session.stream(query)
 
-    result = await session.execute(query)
-    return result.scalars().all()
+    async for rows in result.partitions():
+        yield rows
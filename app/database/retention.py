@@ -0,0 +1,316 @@
+import asyncio
+import gzip
+import json
+import sys
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator
+
+from sqlalchemy import and_, delete, exists, func, not_, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config.config import (
+    BASE_DIR,
+    HISTORY_ARCHIVE_BATCH,
+    HISTORY_ARCHIVE_DIR,
+    HISTORY_RETENTION_DAYS,
+    HISTORY_RETENTION_INTERVAL,
+)
+from database.models import ModerationAction, ModerationEvent, User, UserName
+
+from loguru import logger
+
+
+# sqlite's auto_vacuum value for INCREMENTAL
+_INCREMENTAL = 2
+
+
+def _event_record(event: ModerationEvent, name: str | None) -> tuple[str, dict]:
+    partition = datetime.fromtimestamp(event.time).strftime("%Y-%m")
+
+    return partition, {
+        "id": event.id,
+        "chat_id": event.chat_id,
+        "user_id": event.user_id,
+        "name": name,
+        "action": ModerationAction(event.action).name.lower(),
+        "time": event.time,
+        "duration": event.duration,
+        "reason": event.reason,
+    }
+
+
+def _active_restriction(now: datetime):
+    """
+    True for ban and mute events whose user is still banned or muted in the chat,
+    so the "current" lists keep showing them however old they are.
+    """
+
+    return exists().where(
+        User.id == ModerationEvent.user_id,
+        User.chat_id == ModerationEvent.chat_id,
+        or_(
+            and_(
+                ModerationEvent.action == ModerationAction.BAN,
+                User.is_banned == True,
+                or_(User.ban_duration == None, User.ban_duration > now),
+            ),
+            and_(
+                ModerationEvent.action == ModerationAction.MUTE,
+                User.is_muted == True,
+                or_(User.mute_duration == None, User.mute_duration > now),
+            ),
+        ),
+    )
+
+
+def _user_record(user: User) -> tuple[str, dict]:
+    def iso(value: datetime | None) -> str | None:
+        return value.isoformat() if value else None
+
+    return user.last_seen.strftime("%Y-%m"), {
+        "id": user.id,
+        "chat_id": user.chat_id,
+        "count_messages": user.count_messages,
+        "count_warns": user.count_warns,
+        "count_mutes": user.count_mutes,
+        "count_bans": user.count_bans,
+        "join_date": iso(user.join_date),
+        "last_seen": iso(user.last_seen),
+    }
+
+
+class HistoryRetention:
+    """
+    Moves moderation history and inactive users older than the retention period
+    out of SQLite into compressed, month-partitioned JSONL archives.
+    Bans and mutes that are still in force stay in the database.
+
+    Rows are written to the archive before they are deleted, so a crash in between
+    can only duplicate a batch in the archive, never lose it.
+    """
+
+    def __init__(self, retention_days: int, interval: float, batch_size: int, archive_dir: Path):
+        self.retention_days = retention_days
+        self.interval = interval
+        self.batch_size = batch_size
+        self.archive_dir = archive_dir
+
+        self._task: asyncio.Task | None = None
+
+
+    def start(self, engine: AsyncEngine):
+        if self.retention_days > 0 and not self._task:
+            self._task = asyncio.create_task(self._loop(engine))
+
+
+    async def shutdown(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+    def _append(self, table: str, records: list[tuple[str, dict]]):
+        """
+        Appends records to their monthly archives. Every append adds a gzip member,
+        which gzip readers treat as one continuous stream.
+        """
+
+        partitions = defaultdict(list)
+        for partition, record in records:
+            partitions[partition].append(json.dumps(record, ensure_ascii=False))
+
+        directory = self.archive_dir / table
+        directory.mkdir(parents=True, exist_ok=True)
+
+        for partition, lines in partitions.items():
+            with gzip.open(directory / f"{partition}.jsonl.gz", "at", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+
+
+    async def _archive_events(self, engine: AsyncEngine, cutoff: datetime) -> int:
+        archived = 0
+
+        while True:
+            async with engine.begin() as conn:
+                rows = (await conn.execute(
+                    select(ModerationEvent, UserName.name)
+                    .outerjoin(UserName, UserName.id == ModerationEvent.user_id)
+                    .where(
+                        ModerationEvent.time < int(cutoff.timestamp()),
+                        not_(_active_restriction(datetime.now())),
+                    )
+                    .order_by(ModerationEvent.id)
+                    .limit(self.batch_size)
+                )).all()
+
+                if not rows:
+                    return archived
+
+                await asyncio.to_thread(
+                    self._append, ModerationEvent.__tablename__, [_event_record(row, row.name) for row in rows]
+                )
+
+                await conn.execute(
+                    delete(ModerationEvent).where(ModerationEvent.id.in_([row.id for row in rows]))
+                )
+
+            archived += len(rows)
+
+
+    async def _archive_users(self, engine: AsyncEngine, cutoff: datetime) -> int:
+        """
+        Archives users not seen since the cutoff who were never warned, muted or banned,
+        so /stats keeps the counters of everyone with a moderation history.
+        """
+
+        now = datetime.now()
+        archived = 0
+
+        while True:
+            async with engine.begin() as conn:
+                rows = (await conn.execute(
+                    select(User)
+                    .where(
+                        User.last_seen < cutoff,
+                        func.coalesce(User.count_warns, 0) == 0,
+                        func.coalesce(User.count_mutes, 0) == 0,
+                        func.coalesce(User.count_bans, 0) == 0,
+                        or_(User.is_banned == False, User.ban_duration < now),
+                        or_(User.is_muted == False, User.mute_duration < now),
+                    )
+                    .limit(self.batch_size)
+                )).all()
+
+                if not rows:
+                    return archived
+
+                await asyncio.to_thread(
+                    self._append, User.__tablename__, [_user_record(row) for row in rows]
+                )
+
+                await conn.execute(
+                    delete(User).where(
+                        tuple_(User.id, User.chat_id).in_([(row.id, row.chat_id) for row in rows])
+                    )
+                )
+
+            archived += len(rows)
+
+
+    async def _release_space(self, engine: AsyncEngine):
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+
+            if (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar() != _INCREMENTAL:
+                logger.warning(
+                    "Database does not use incremental auto_vacuum, freed pages stay in the file; "
+                    "run `python -m database.retention vacuum` once while the bot is stopped"
+                )
+                return
+
+            # a plain execute frees a single page per step, executescript runs the pragma to the end
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.executescript("PRAGMA incremental_vacuum;")
+
+
+    async def run(self, engine: AsyncEngine) -> dict[str, int]:
+        """
+        Archives everything past the retention period and returns how many rows were moved.
+        """
+
+        cutoff = datetime.now() - timedelta(days=self.retention_days)
+
+        result = {
+            "events": await self._archive_events(engine, cutoff),
+            "users": await self._archive_users(engine, cutoff),
+        }
+
+        if any(result.values()):
+            await self._release_space(engine)
+            logger.info(f"Archived history older than {cutoff:%Y-%m-%d}: {result}")
+
+        return result
+
+
+    async def _loop(self, engine: AsyncEngine):
+        while True:
+            try:
+                await self.run(engine)
+
+            except Exception:
+                logger.exception("History retention run failed")
+
+            await asyncio.sleep(self.interval)
+
+
+    def read(self, table: str, since: str | None = None, until: str | None = None) -> Iterator[dict]:
+        """
+        Yields archived records of a table, optionally only from the months since..until (YYYY-MM).
+        """
+
+        for path in sorted((self.archive_dir / table).glob("*.jsonl.gz")):
+            partition = path.name.removesuffix(".jsonl.gz")
+
+            if (since and partition < since) or (until and partition > until):
+                continue
+
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    yield json.loads(line)
+
+
+history_retention = HistoryRetention(
+    retention_days=HISTORY_RETENTION_DAYS,
+    interval=HISTORY_RETENTION_INTERVAL,
+    batch_size=HISTORY_ARCHIVE_BATCH,
+    archive_dir=BASE_DIR / HISTORY_ARCHIVE_DIR,
+)
+
+
+async def _vacuum(engine: AsyncEngine):
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+        await conn.exec_driver_sql("VACUUM")
+
+
+if __name__ == "__main__":
+    # python -m database.retention archive | vacuum | read TABLE [--chat ID] [--user ID] [--since YYYY-MM] [--until YYYY-MM]
+    import argparse
+
+    from database.engine import engine
+
+    parser = argparse.ArgumentParser(description="Moderation history retention")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("archive", help="archive everything past the retention period now")
+    commands.add_parser("vacuum", help="switch the database to incremental auto_vacuum and compact it")
+
+    read = commands.add_parser("read", help="print archived records as JSON lines")
+    read.add_argument("table", choices=[ModerationEvent.__tablename__, User.__tablename__])
+    read.add_argument("--chat", type=int)
+    read.add_argument("--user", type=int)
+    read.add_argument("--since", help="first month, YYYY-MM")
+    read.add_argument("--until", help="last month, YYYY-MM")
+
+    args = parser.parse_args()
+
+    if args.command == "archive":
+        print(asyncio.run(history_retention.run(engine)))
+
+    elif args.command == "vacuum":
+        asyncio.run(_vacuum(engine))
+
+    else:
+        user_key = "user_id" if args.table == ModerationEvent.__tablename__ else "id"
+
+        for record in history_retention.read(args.table, args.since, args.until):
+            if args.chat is not None and record["chat_id"] != args.chat:
+                continue
+            if args.user is not None and record[user_key] != args.user:
+                continue
+
+            sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
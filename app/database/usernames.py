@@ -0,0 +1,247 @@
+import asyncio
+
+from collections import OrderedDict
+
+from aiogram import types
+
+from sqlalchemy import select, tuple_, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from config.config import USERNAME_INDEX_CACHE_SIZE, USERNAME_INDEX_FLUSH_INTERVAL
+from database.models import ChatUsername
+
+from loguru import logger
+
+
+# username, first name, last name, is_bot
+_Entry = tuple[str | None, str, str | None, bool]
+
+
+def normalize_username(username: str) -> str:
+    return username.removeprefix("@").lower()
+
+
+class UsernameIndex:
+    """
+    Maps (chat_id, username) and (chat_id, user_id) to the user as last seen in the chat,
+    so commands can target @username and show names without get_chat_member calls.
+    Fed from every message and member update in groups: a user whose name did not change
+    costs one dict lookup, changes are written to the chat_username table in batches.
+    """
+
+    def __init__(self, size: int, flush_interval: float):
+        self.size = size
+        self.flush_interval = flush_interval
+
+        # (chat_id, user_id) -> (username, first name, last name, is_bot), least recently used first
+        self._users: OrderedDict[tuple[int, int], _Entry] = OrderedDict()
+        # (chat_id, username) -> user_id, only for users in _users
+        self._usernames: dict[tuple[int, str], int] = {}
+
+        self._pending: dict[tuple[int, int], _Entry] = {}
+        self._lock = asyncio.Lock()
+
+        self._session_pool: async_sessionmaker | None = None
+        self._loop_task: asyncio.Task | None = None
+
+
+    def start(self, session_pool: async_sessionmaker):
+        self._session_pool = session_pool
+
+        if not self._loop_task:
+            self._loop_task = asyncio.create_task(self._flush_loop())
+
+
+    async def shutdown(self):
+        if self._loop_task:
+            self._loop_task.cancel()
+            self._loop_task = None
+
+        await self.flush()
+
+
+    def _drop_username(self, chat_id: int, user_id: int, username: str | None):
+        if username and self._usernames.get((chat_id, username)) == user_id:
+            del self._usernames[(chat_id, username)]
+
+
+    def _remember(self, chat_id: int, user_id: int, entry: _Entry):
+        key = (chat_id, user_id)
+
+        old = self._users.get(key)
+        if old:
+            self._drop_username(chat_id, user_id, old[0])
+
+        self._users[key] = entry
+        self._users.move_to_end(key)
+
+        if entry[0]:
+            # the previous owner keeps its entry without the username, as its row does
+            previous = self._usernames.get((chat_id, entry[0]))
+            if previous is not None and previous != user_id and (chat_id, previous) in self._users:
+                self._users[(chat_id, previous)] = (None, *self._users[(chat_id, previous)][1:])
+
+            self._usernames[(chat_id, entry[0])] = user_id
+
+        while len(self._users) > self.size:
+            (evicted_chat, evicted_user), evicted = self._users.popitem(last=False)
+            self._drop_username(evicted_chat, evicted_user, evicted[0])
+
+
+    def see(self, chat_id: int, user: types.User):
+        username = normalize_username(user.username) if user.username else None
+        entry = (username, user.first_name, user.last_name, user.is_bot)
+
+        key = (chat_id, user.id)
+
+        if self._users.get(key) == entry:
+            self._users.move_to_end(key)
+            return
+
+        self._remember(chat_id, user.id, entry)
+        self._pending[key] = entry
+
+
+    async def _load(self, query) -> ChatUsername | None:
+        if not self._session_pool:
+            return None
+
+        async with self._session_pool() as session:
+            row = await session.scalar(query)
+
+        if row and (row.chat_id, row.user_id) not in self._users:
+            entry = (
+                row.username,
+                row.first_name if row.first_name is not None else row.full_name,
+                row.last_name,
+                bool(row.is_bot),
+            )
+            self._remember(row.chat_id, row.user_id, entry)
+
+        return row
+
+
+    def _user(self, chat_id: int, user_id: int) -> types.User | None:
+        entry = self._users.get((chat_id, user_id))
+        if not entry:
+            return None
+
+        username, first_name, last_name, is_bot = entry
+
+        return types.User(
+            id=user_id, is_bot=is_bot, first_name=first_name, last_name=last_name, username=username
+        )
+
+
+    async def resolve(self, chat_id: int, username: str) -> types.User | None:
+        """
+        Returns the user seen in the chat with a @username, or None.
+        """
+
+        username = normalize_username(username)
+
+        user_id = self._usernames.get((chat_id, username))
+
+        if user_id is None:
+            row = await self._load(
+                select(ChatUsername).where(
+                    ChatUsername.chat_id == chat_id, ChatUsername.username == username
+                )
+            )
+            if not row:
+                return None
+
+            user_id = row.user_id
+
+        # the row is older than a rename seen since
+        user = self._user(chat_id, user_id)
+        if not user or user.username != username:
+            return None
+
+        return user
+
+
+    async def user(self, chat_id: int, user_id: int) -> types.User | None:
+        """
+        Returns a user as last seen in the chat, or None.
+        """
+
+        if (chat_id, user_id) not in self._users:
+            await self._load(
+                select(ChatUsername).where(
+                    ChatUsername.chat_id == chat_id, ChatUsername.user_id == user_id
+                )
+            )
+
+        return self._user(chat_id, user_id)
+
+
+    async def flush(self):
+        """
+        Writes all new and changed entries in one transaction.
+        A username now held by another user is taken away from its old owner.
+        """
+
+        async with self._lock:
+            if not self._pending or not self._session_pool:
+                return
+
+            pending, self._pending = self._pending, {}
+
+            rows = [
+                {
+                    "chat_id": chat_id,
+                    "user_id": user_id,
+                    # a username passed on to another user within the same batch is written once
+                    "username": username
+                    if self._usernames.get((chat_id, username), user_id) == user_id
+                    else None,
+                    "full_name": f"{first_name} {last_name}" if last_name else first_name,
+                    "first_name": first_name,
+                    "last_name": last_name,
+                    "is_bot": is_bot,
+                }
+                for (chat_id, user_id), (username, first_name, last_name, is_bot) in pending.items()
+            ]
+            taken = [(row["chat_id"], row["username"]) for row in rows if row["username"]]
+
+            stmt = insert(ChatUsername)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[ChatUsername.chat_id, ChatUsername.user_id],
+                set_={
+                    name: stmt.excluded[name]
+                    for name in ("username", "full_name", "first_name", "last_name", "is_bot")
+                },
+            )
+
+            try:
+                async with self._session_pool() as session:
+                    if taken:
+                        # the old owner keeps its row and name, only without the username
+                        await session.execute(
+                            update(ChatUsername)
+                            .where(tuple_(ChatUsername.chat_id, ChatUsername.username).in_(taken))
+                            .values(username=None)
+                        )
+
+                    await session.execute(stmt, rows)
+                    await session.commit()
+
+            except Exception:
+                logger.exception(f"Failed to flush {len(rows)} usernames")
+
+                for key, entry in pending.items():
+                    self._pending.setdefault(key, entry)
+
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+username_index = UsernameIndex(
+    size=USERNAME_INDEX_CACHE_SIZE,
+    flush_interval=USERNAME_INDEX_FLUSH_INTERVAL,
+)
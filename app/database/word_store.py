@@ -0,0 +1,283 @@
+import os
+import re
+import sys
+import threading
+
+from pathlib import Path
+
+from config.config import BASE_DIR, BAD_WORDS_FILE, BAD_WORDS_LOG_FILE, BAD_WORDS_COMPACT_AFTER
+
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: only writers inside this process are serialized
+    fcntl = None
+
+
+_NOT_WORD_CHARS = re.compile(r"[^а-яa-z0-9]")
+
+
+def extract_word(line: str) -> str:
+    """
+    Normalize a word by removing special characters and converting to lowercase.
+    """
+
+    return _NOT_WORD_CHARS.sub("", line.strip().lower())
+
+
+class BanWordStore:
+    """
+    Global ban-word list kept as a plain-text snapshot plus an append-only log of edits.
+
+    Every edit appends one "+word" or "-word" line to the log instead of rewriting the list.
+    Once the log grows past compact_after entries it is folded back into the snapshot,
+    which stays a one-word-per-line file used for import and export.
+    Words are indexed by their normalized form for constant-time existence checks.
+    """
+
+    def __init__(self, path: Path, log_path: Path, compact_after: int):
+        self.path = path
+        self.log_path = log_path
+        self.compact_after = compact_after
+
+        self._words: dict[str, None] = {}
+        self._index: dict[str, list[str]] = {}
+        self._snapshot: frozenset[str] = frozenset()
+        self._log_entries = 0
+        self._loaded_stat: tuple | None = None
+
+        # guards the in-memory state across threads
+        self._mutex = threading.RLock()
+
+
+    def disk_stat(self) -> tuple:
+        """
+        Identity of the files on disk; changes whenever any process edits the list.
+        """
+
+        return tuple(
+            (path.name, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            for path in (self.path, self.log_path)
+            if (stat := path.stat() if path.exists() else None)
+        )
+
+
+    def _add(self, word: str) -> bool:
+        key = extract_word(word)
+
+        if not key or key in self._index:
+            return False
+
+        self._words[word] = None
+        self._index[key] = [word]
+        return True
+
+
+    def _remove(self, word: str) -> bool:
+        removed = self._index.pop(extract_word(word), None)
+
+        for entry in removed or ():
+            del self._words[entry]
+
+        return bool(removed)
+
+
+    def _load(self):
+        self._words, self._index, self._log_entries = {}, {}, 0
+        stat = self.disk_stat()
+
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                word = line.strip().lower()
+                if not word:
+                    continue
+
+                # the snapshot may hold several spellings with the same normalized form
+                self._words[word] = None
+                self._index.setdefault(extract_word(word), []).append(word)
+
+        if self.log_path.exists():
+            with open(self.log_path, encoding="utf-8") as f:
+                for line in f:
+                    op, word = line[:1], line[1:].strip()
+
+                    if op == "+":
+                        self._add(word)
+                    elif op == "-":
+                        self._remove(word)
+
+                    self._log_entries += 1
+
+        self._snapshot = frozenset(self._words)
+        self._loaded_stat = stat
+
+
+    def _refresh(self):
+        # re-read the files if another process changed them; the caller holds _mutex
+        if self._loaded_stat != self.disk_stat():
+            self._load()
+
+
+    def snapshot(self) -> tuple[tuple, frozenset[str]]:
+        """
+        Returns the current words and the disk_stat() they correspond to,
+        re-reading the files first if another process changed them.
+        """
+
+        with self._mutex:
+            self._refresh()
+
+            return self._loaded_stat, self._snapshot
+
+
+    def words(self) -> frozenset[str]:
+        return self.snapshot()[1]
+
+
+    def contains(self, word: str) -> bool:
+        with self._mutex:
+            self._refresh()
+
+            return extract_word(word) in self._index
+
+
+    def entries(self, word: str) -> list[str]:
+        """
+        Returns the list entries that share the normalized form of a word.
+        """
+
+        with self._mutex:
+            self._refresh()
+
+            return list(self._index.get(extract_word(word), ()))
+
+
+    def _write(self, op: str, words: list[str]) -> int:
+        """
+        Applies edits and appends them to the log with a single fsync.
+        Holds an exclusive file lock, so edits from other processes are read first and never lost.
+        """
+
+        with self._mutex, open(self.log_path, "a", encoding="utf-8") as log:
+            if fcntl:
+                fcntl.flock(log, fcntl.LOCK_EX)
+
+            try:
+                self._refresh()
+
+                apply = self._add if op == "+" else self._remove
+                lines = [f"{op}{word}\n" for word in words if apply(word)]
+
+                try:
+                    log.writelines(lines)
+                    log.flush()
+                    os.fsync(log.fileno())
+
+                except OSError:
+                    # the log is the source of truth: drop the unsaved in-memory edits
+                    self._load()
+                    raise
+
+                self._log_entries += len(lines)
+
+                if self._log_entries >= self.compact_after:
+                    self._compact(log)
+
+                self._snapshot = frozenset(self._words)
+                self._loaded_stat = self.disk_stat()
+                return len(lines)
+
+            finally:
+                if fcntl:
+                    fcntl.flock(log, fcntl.LOCK_UN)
+
+
+    def _compact(self, log):
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(f"{word}\n" for word in self._words)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp_path, self.path)
+
+        # truncate in place, other processes lock this same file
+        log.truncate(0)
+        self._log_entries = 0
+
+        logger.info(f"Ban-word log compacted into {self.path.name}: {len(self._words)} words")
+
+
+    def import_file(self, path: Path) -> int:
+        """
+        Adds every new word of a one-word-per-line file. Returns how many were added.
+        """
+
+        with open(path, encoding="utf-8") as f:
+            words = [line.strip().lower() for line in f if line.strip()]
+
+        return self._write("+", words)
+
+
+    def export_file(self, path: Path) -> int:
+        """
+        Writes the list as a one-word-per-line file. Returns how many words were written.
+        """
+
+        with self._mutex:
+            self.snapshot()
+
+            with open(path, "w", encoding="utf-8") as f:
+                f.writelines(f"{word}\n" for word in self._words)
+
+            return len(self._words)
+
+
+    def compact(self):
+        with self._mutex:
+            self._write("+", [])
+
+            with open(self.log_path, "a", encoding="utf-8") as log:
+                if fcntl:
+                    fcntl.flock(log, fcntl.LOCK_EX)
+
+                try:
+                    self._compact(log)
+                    self._loaded_stat = self.disk_stat()
+
+                finally:
+                    if fcntl:
+                        fcntl.flock(log, fcntl.LOCK_UN)
+
+
+ban_word_store = BanWordStore(
+    path=BASE_DIR / BAD_WORDS_FILE,
+    log_path=BASE_DIR / BAD_WORDS_LOG_FILE,
+    compact_after=BAD_WORDS_COMPACT_AFTER,
+)
+
+
+if __name__ == "__main__":
+    # maintenance of the global list: python -m database.word_store <command> [argument]
+    usage = "usage: python -m database.word_store add|remove WORD | import|export FILE | compact"
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ("add", "remove", "import", "export", "compact"):
+        sys.exit(usage)
+
+    command, argument = sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None
+
+    if command != "compact" and not argument:
+        sys.exit(usage)
+
+    if command == "add":
+        print("added" if ban_word_store._write("+", [argument.lower()]) else "already exists")
+    elif command == "remove":
+        print("removed" if ban_word_store._write("-", [argument.lower()]) else "not found")
+    elif command == "import":
+        print(f"{ban_word_store.import_file(Path(argument))} words imported")
+    elif command == "export":
+        print(f"{ban_word_store.export_file(Path(argument))} words exported")
+    else:
+        ban_word_store.compact()
@@ -1,9 +1,10 @@
 from aiogram import Bot, types
 from aiogram.filters import Filter
 
+from services.admin_service import admin_roster
+
 
 class IsAdmin(Filter):
     async def __call__(self, message: types.Message, bot: Bot):
-        member = await bot.get_chat_member(message.chat.id, message.from_user.id)
-
-        return member.status in ("creator", "administrator")
+        # served from the cached roster, no API call per command
+        return await admin_roster.is_admin(bot, message.chat.id, message.from_user.id)
@@ -9,6 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 import locales.group as s
 
 from services.captcha_service import CaptchaService
+from services.member_service import get_member_status
 
 from filters.chat_filters import ChatTypeFilter
 
@@ -39,9 +40,8 @@ async def captcha(event: types.ChatMemberUpdated, session: AsyncSession):
 
     await sleep(300)
 
-    current_member = await event.bot.get_chat_member(
-        chat_id=event.chat.id, user_id=user.id
-    )
+    # the mirror follows the chat_member update sent when the user is unmuted
+    current_member = await get_member_status(event.bot, event.chat.id, user.id)
 
     if current_member.status == "restricted" and not current_member.can_send_messages:
         await service.fail_captcha(event.chat, user)
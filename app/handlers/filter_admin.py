@@ -1,11 +1,21 @@
+from functools import partial
+
 from aiogram import Router, types
 from aiogram.filters import Command, CommandObject
 
-from config.config import BAD_WORDS_FILE
+from sqlalchemy.ext.asyncio import AsyncSession
+
 import locales.group as s
+from database.engine import after_commit
 from filters.chat_filters import ChatTypeFilter
 from filters.group_filters import IsAdmin
-from services.filters_service import add_filter_word, remove_filter_word, _word_exists
+from services.filters_service import (
+    add_chat_filter_word,
+    remove_chat_filter_word,
+    invalidate_chat_matcher,
+)
+
+from loguru import logger
 
 
 filter_router = Router()
@@ -13,48 +23,58 @@ filter_router.message.filter(ChatTypeFilter(["group", "supergroup"]))
 
 
 @filter_router.message(Command('addfilter', 'removefilter'), IsAdmin())
-async def profanity_filter(message: types.Message, command: CommandObject):
+async def profanity_filter(
+    message: types.Message, command: CommandObject, session: AsyncSession
+):
     """
-    Handler for adding or removing words from the profanity filter.
+    Handler for adding or removing words from the profanity filter of the current chat.
     """
 
     if not command.args:
         await message.reply(s.FILTER_NO_ARGS)
         return
-    
+
     action = command.command
     word = command.args.strip()
 
     if action == "addfilter":
         try:
-            with open(BAD_WORDS_FILE, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-            
-            if _word_exists(word, lines):
-                await message.reply(s.ADD_WORD_EXISTS.format(word=word))
-                return
+            changed = await add_chat_filter_word(session, message.chat.id, word)
+
+            if changed:
+                # surface database errors here, the commit itself happens after the handler
+                await session.flush()
+
         except Exception:
+            logger.exception(f"Failed to add filter word in chat {message.chat.id}")
+            await session.rollback()
             await message.reply(s.ADD_FAIL_FILTER_WORD)
             return
 
-        if await add_filter_word(word):
-            await message.reply(s.ADD_FILTER_WORD.format(word=word))
-        else:
-            await message.reply(s.ADD_FAIL_FILTER_WORD)
+        if not changed:
+            await message.reply(s.ADD_WORD_EXISTS.format(word=word))
+            return
+
+        after_commit(session, partial(invalidate_chat_matcher, message.chat.id))
+        await message.reply(s.ADD_FILTER_WORD.format(word=word))
 
     else:
         try:
-            with open(BAD_WORDS_FILE, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-            
-            if not _word_exists(word, lines):
-                await message.reply(s.REMOVE_WORD_NOT_FOUND.format(word=word))
-                return
+            changed = await remove_chat_filter_word(session, message.chat.id, word)
+
+            if changed:
+                # surface database errors here, the commit itself happens after the handler
+                await session.flush()
+
         except Exception:
+            logger.exception(f"Failed to remove filter word in chat {message.chat.id}")
+            await session.rollback()
             await message.reply(s.REMOVE_FAIL_FILTER_WORD)
             return
 
-        if await remove_filter_word(word):
-            await message.reply(s.REMOVE_FILTER_WORD.format(word=word))
-        else:
-            await message.reply(s.REMOVE_FAIL_FILTER_WORD)
\ No newline at end of file
+        if not changed:
+            await message.reply(s.REMOVE_WORD_NOT_FOUND.format(word=word))
+            return
+
+        after_commit(session, partial(invalidate_chat_matcher, message.chat.id))
+        await message.reply(s.REMOVE_FILTER_WORD.format(word=word))
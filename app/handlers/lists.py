@@ -6,35 +6,51 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 from sqlalchemy.ext.asyncio import AsyncSession
 
 import locales.group as s
+from config.config import EXPORT_MAX_SIZE
+from database.models import ModerationAction
 from filters.group_filters import IsAdmin
 from filters.chat_filters import ChatTypeFilter
+from services.export_service import EXPORT_FORMATS, NoRecordsExport, export_history
 from services.history_service import (
     HistoryService,
     NoRecordsBan,
     NoRecordsMute,
     NoRecordsWarn,
     Pagination,
+    decode_cursor,
 )
 
+from loguru import logger
+
 lists_router = Router()
 lists_router.message.filter(ChatTypeFilter(["group", "supergroup"]))
 
 
-def get_pagination_kb(action: str, page: int, has_next: bool, has_prev: bool):
+def get_pagination_kb(action: str, page: int, current: bool, result: dict):
     """
     Generates an inline keyboard for navigating through history lists.
+    Each button carries the key of the record its page continues from.
     """
 
     builder = InlineKeyboardBuilder()
 
-    if has_prev:
+    if result["has_prev"]:
+        time, record_id = result["first"]
         builder.button(
-            text="⬅️ Back", callback_data=Pagination(action=action, page=page - 1)
+            text="⬅️ Back",
+            callback_data=Pagination(
+                action=action, page=page - 1, current=current,
+                time=time, id=record_id, backward=True,
+            ),
         )
 
-    if has_next:
+    if result["has_next"]:
+        time, record_id = result["last"]
         builder.button(
-            text="Next ➡️", callback_data=Pagination(action=action, page=page + 1)
+            text="Next ➡️",
+            callback_data=Pagination(
+                action=action, page=page + 1, current=current, time=time, id=record_id,
+            ),
         )
 
     return builder.as_markup()
@@ -54,7 +70,12 @@ async def list_cmd(
 
     history_scope = "Current users history" if current else "Full history"
 
-    services = HistoryService(session=session, history_scope=history_scope)
+    services = HistoryService(
+        session=session, chat_id=message.chat.id, history_scope=history_scope
+    )
+
+    if action == "warn_list":
+        current = False
 
     try:
         if action == "ban_list":
@@ -64,7 +85,7 @@ async def list_cmd(
             result = await services.mute_history(page=1, current=current)
 
         else:
-            result = await services.warn_history(page=1, current=False)
+            result = await services.warn_history(page=1, current=current)
 
     except NoRecordsBan:
         return await message.reply(s.BAN_NO_RECORDS)
@@ -78,10 +99,7 @@ async def list_cmd(
     await message.reply(
         text=result["text"],
         reply_markup=get_pagination_kb(
-            action=action,
-            page=1,
-            has_next=result["has_next"],
-            has_prev=result["has_prev"],
+            action=action, page=1, current=current, result=result
         ),
     )
 
@@ -92,21 +110,90 @@ async def list_pagination_handler(
 ):
     """Handler for pressing the Forward/Backward buttons"""
 
-    services = HistoryService(session=session, history_scope="Full history")
+    history_scope = "Current users history" if callback_data.current else "Full history"
+
+    services = HistoryService(
+        session=session, chat_id=callback.message.chat.id, history_scope=history_scope
+    )
+
+    page = dict(
+        current=callback_data.current,
+        page=callback_data.page,
+        cursor=decode_cursor(callback_data.time, callback_data.id),
+        backward=callback_data.backward,
+    )
+
+    try:
+        if callback_data.action == "ban_list":
+            result = await services.ban_history(**page)
 
-    if callback_data.action == "ban_list":
-        result = await services.ban_history(page=callback_data.page)
-    else:
-        result = await services.mute_history(page=callback_data.page)
+        elif callback_data.action == "mute_list":
+            result = await services.mute_history(**page)
+
+        else:
+            result = await services.warn_history(**page)
+
+    except (NoRecordsBan, NoRecordsMute, NoRecordsWarn):
+        # the records of this page were removed since the list was sent
+        return await callback.answer()
 
     await callback.message.edit_text(
         text=result["text"],
         reply_markup=get_pagination_kb(
             action=callback_data.action,
             page=callback_data.page,
-            has_next=result["has_next"],
-            has_prev=result["has_prev"],
+            current=callback_data.current,
+            result=result,
         ),
     )
 
     await callback.answer()
+
+
+@lists_router.message(Command("export_history"), IsAdmin())
+async def export_history_cmd(
+    message: types.Message, session: AsyncSession, command: CommandObject
+):
+    """
+    Sends the moderation history of the chat as a CSV or JSONL document.
+    Usage: /export_history [csv|jsonl] [ban|mute|warn] [gz]
+    """
+
+    fmt, action, compress = "csv", None, False
+
+    for arg in (command.args or "").lower().split():
+        if arg in EXPORT_FORMATS:
+            fmt = arg
+
+        elif arg.upper() in ModerationAction.__members__:
+            action = ModerationAction[arg.upper()]
+
+        elif arg == "gz":
+            compress = True
+
+        else:
+            return await message.reply(s.EXPORT_USAGE)
+
+    try:
+        document, rows = await export_history(
+            session, message.chat.id, fmt=fmt, action=action, compress=compress
+        )
+
+    except NoRecordsExport:
+        return await message.reply(s.EXPORT_NO_RECORDS)
+
+    except Exception:
+        logger.exception(f"Failed to export history of chat {message.chat.id}")
+        return await message.reply(s.EXPORT_FAILED)
+
+    try:
+        if document.size > EXPORT_MAX_SIZE:
+            return await message.reply(
+                s.EXPORT_TOO_LARGE.format(size=round(document.size / 1024 / 1024))
+            )
+
+        await message.reply_document(document, caption=s.EXPORT_CAPTION.format(rows=rows))
+        logger.info(f"Exported {rows} history records of chat {message.chat.id}")
+
+    finally:
+        document.close()
@@ -1,10 +1,17 @@
+import asyncio
+
+from functools import partial
+from html import escape
+
 from aiogram import Bot, types, Router
 from aiogram.filters import Command
 from aiogram.filters.command import CommandObject
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from config.config import MAX_WARNS
+from database.engine import after_commit
+from database.usernames import username_index
+
 import locales.group as s
 
 from filters.group_filters import IsAdmin
@@ -20,12 +27,53 @@ from services.restriction_service import (
     ZeroCurrentWarns,
 )
 
+from services.admin_service import admin_roster
+from services.filters_service import get_chat_matcher
+from services.log_service import log_queue
+from services.scan_service import scan_pool
+from services.settings_service import get_chat_settings
+
+from utils.text import LINK_PATTERN, ScanVerdict
+
 from utils.time import parse_time
-from utils.text import contains_bad_word, contains_link
 
 moderation_router = Router()
 moderation_router.message.filter(ChatTypeFilter(["group", "supergroup"]))
 
+# replies of the cleaner still being sent, referenced until they finish
+_replies: set[asyncio.Task] = set()
+
+
+async def _send_reply(message: types.Message, text: str):
+    try:
+        await message.reply(text, allow_sending_without_reply=True)
+
+    except Exception as e:
+        logger.debug(f"Could not send reply in chat {message.chat.id}: {e}")
+
+
+def _reply_later(message: types.Message, text: str):
+    """
+    Sends a reply in the background. Replies to a busy chat wait for its rate limit,
+    and the update's deletes and database transaction must not wait with them.
+    """
+
+    task = asyncio.create_task(_send_reply(message, text))
+    _replies.add(task)
+    task.add_done_callback(_replies.discard)
+
+
+def _reply_after_commit(session: AsyncSession, message: types.Message, text: str):
+    """
+    Sends a reply once the update's transaction is committed, so the database is not held
+    while the reply waits for the chat's rate limit. Sent right away if nothing is open.
+    """
+
+    if session.started and session.in_transaction():
+        after_commit(session, partial(_reply_later, message, text))
+    else:
+        _reply_later(message, text)
+
 
 @moderation_router.message(Command("warn", "unwarn"), IsAdmin())
 async def warn_cmd(
@@ -54,41 +102,45 @@ async def warn_cmd(
                 message.chat.id, target_user, message.reply_to_message
             )
         except ZeroCurrentWarns:
-            await message.reply(text=s.ZERO_CURRENT_WARNS)
+            _reply_after_commit(session, message, s.ZERO_CURRENT_WARNS)
             return
 
     if result["status"] == "warned":
-        await message.reply(
-            text=s.ACTION_WARN_TO.format(
+        _reply_after_commit(
+            session,
+            message,
+            s.ACTION_WARN_TO.format(
                 first_name=target_user.first_name,
                 current_warns=result["current_warns"],
-                max_warns=MAX_WARNS,
+                max_warns=result["max_warns"],
             )
         )
 
     elif result["status"] == "auto_muted":
-        # auto-muted after MAX_WARNS warns
-        await message.reply(
-            text=s.ACCESS_RESTRICTED.format(
+        # auto-muted after the chat's warn limit
+        _reply_after_commit(
+            session,
+            message,
+            s.ACCESS_RESTRICTED.format(
                 first_name=target_user.first_name,
-                warnings=MAX_WARNS,
-                max_warns=MAX_WARNS,
+                warnings=result["max_warns"],
+                max_warns=result["max_warns"],
                 duration=result["duration"],
                 mute_count=result["mute_count"],
             )
         )
 
     elif result["status"] == "unwarned":
-        await message.reply(
-            text=s.ACTION_UNWARN_TO.format(
+        _reply_after_commit(
+            session,
+            message,
+            s.ACTION_UNWARN_TO.format(
                 first_name=target_user.first_name,
                 current_warns=result["current_warns"],
-                max_warns=MAX_WARNS,
+                max_warns=result["max_warns"],
             )
         )
 
-    await session.commit()
-
 
 @moderation_router.message(
     Command("mute", "ban", "unmute", "unban"),
@@ -102,7 +154,7 @@ async def restriction_cmd(
 ):
     """
     Unified handler for restriction commands (mute, ban, unmute, unban).
-    Supports both reply to message and explicit User ID.
+    Supports reply to message, explicit User ID and @username of a user seen in the chat.
     """
 
     if not message.reply_to_message and not command.args:
@@ -117,22 +169,33 @@ async def restriction_cmd(
         target_user = message.reply_to_message.from_user
 
     else:
-        if not args or not args[0].isdigit():
-            await message.reply(s.INVALID_FORMAT)
-            return
+        if args and args[0].startswith("@"):
+            target_user = await username_index.resolve(message.chat.id, args[0])
 
-        user_id = int(args[0])
-        args = args[1:]
+            if not target_user:
+                await message.reply(s.USER_NOT_FOUND.format(username=escape(args[0])))
+                return
 
-        try:
-            member = await bot.get_chat_member(message.chat.id, user_id)
-            target_user = member.user
+        elif args and args[0].isdigit():
+            # the user as last seen in this chat, asked from the API if never seen
+            target_user = await username_index.user(message.chat.id, int(args[0]))
 
-        except Exception:
-            # if we can't get user info, we can't proceed because service needs name
-            await message.reply(s.SYSTEM_ERROR_MUTE)
+            if not target_user:
+                try:
+                    member = await bot.get_chat_member(message.chat.id, int(args[0]))
+                    target_user = member.user
+
+                except Exception:
+                    # if we can't get user info, we can't proceed because service needs name
+                    await message.reply(s.SYSTEM_ERROR_MUTE)
+                    return
+
+        else:
+            await message.reply(s.INVALID_FORMAT)
             return
 
+        args = args[1:]
+
     # parse common arguments
     extend = "set" in [a.lower() for a in args]
     args = [a for a in args if a.lower() != "set"]
@@ -187,24 +250,24 @@ async def restriction_cmd(
             )
 
     except AlreadyRestrictedError:
-        await message.reply(s.ALREADY_MUTED)
+        _reply_after_commit(session, message, s.ALREADY_MUTED)
         return
 
     except NotRestrictedError:
-        await message.reply(s.SYSTEM_ERROR_UNMUTE)
+        _reply_after_commit(session, message, s.SYSTEM_ERROR_UNMUTE)
         return
 
     except AlreadyBannedError:
-        await message.reply(s.ALREADY_BANNED)
+        _reply_after_commit(session, message, s.ALREADY_BANNED)
         return
 
     except PermissionError:
-        await message.reply(s.ADMIN_NOTICE)
+        _reply_after_commit(session, message, s.ADMIN_NOTICE)
         return
 
     except Exception as e:
         logger.exception(f"Action {action} failed, {e}")
-        await message.reply(s.SYSTEM_ERROR_MUTE)
+        _reply_after_commit(session, message, s.SYSTEM_ERROR_MUTE)
         return
 
     # success response
@@ -221,7 +284,9 @@ async def restriction_cmd(
         "unban": "unbanned",
     }
 
-    await message.reply(
+    _reply_after_commit(
+        session,
+        message,
         s.ACTION_USER.format(
             name=target_user.full_name,
             status_text=status_map[action],
@@ -230,8 +295,6 @@ async def restriction_cmd(
         )
     )
 
-    await session.commit()
-
 
 @moderation_router.edited_message
 @moderation_router.message()
@@ -248,9 +311,20 @@ async def cleaner(message: types.Message, bot: Bot, session: AsyncSession):
     if not content:
         return
 
-    if contains_link(content):
-        await message.reply(s.ADS_MESSAGE)
+    settings = await get_chat_settings(session, message.chat.id)
 
+    if settings.filter_bad_words:
+        matcher = await get_chat_matcher(session, message.chat.id)
+        # with links allowed the text is still scanned for ban words
+        verdict = await scan_pool.scan(content, matcher, first_rule_only=settings.filter_links)
+
+    elif settings.filter_links:
+        verdict = ScanVerdict.build(LINK_PATTERN.findall(content), [])
+
+    else:
+        return
+
+    if settings.filter_links and verdict.links:
         try:
             await message.delete()
 
@@ -258,21 +332,30 @@ async def cleaner(message: types.Message, bot: Bot, session: AsyncSession):
             logger.debug(
                 f"Could not delete message with link in chat {message.chat.id}"
             )
-        return
 
-    if contains_bad_word(content):
-        words = ' '.join(contains_bad_word(content))
+        _reply_later(message, s.ADS_MESSAGE)
+        return
 
-    else:
+    if not verdict.bad_words:
         return
 
+    words = ' '.join(verdict.bad_words)
+
     user = message.from_user
-    member = await bot.get_chat_member(message.chat.id, user.id)
 
-    if member.status in ("creator", "administrator"):
-        await message.reply(s.ADMIN_NOTICE)
+    if await admin_roster.is_admin(bot, message.chat.id, user.id):
+        _reply_later(message, s.ADMIN_NOTICE)
         return
 
+    try:
+        await message.delete()
+        log_queue.mark_deleted(message.chat.id, message.message_id)
+
+    except Exception:
+        logger.debug(
+            f"Could not delete message with profanity in chat {message.chat.id}"
+        )
+
     service = RestrictionService(bot, session)
     result = await service.warn(
         chat_id=message.chat.id, user=user, message=message, reason="Profanity filter"
@@ -280,36 +363,28 @@ async def cleaner(message: types.Message, bot: Bot, session: AsyncSession):
 
     if result["status"] == "warned":
         logger.info(
-            f"Message from {user.id} in chat {message.chat.id} deleted (bad word). Warnings: {result['current_warns']}/{MAX_WARNS}"
+            f"Message from {user.id} in chat {message.chat.id} deleted (bad word). Warnings: {result['current_warns']}/{result['max_warns']}"
         )
-        await message.reply(
-            text=s.SENT_AUTO_WARN.format(
+        _reply_later(
+            message,
+            s.SENT_AUTO_WARN.format(
                 first_name=user.first_name,
                 current_warns=result["current_warns"],
-                max_warns=MAX_WARNS,
+                max_warns=result["max_warns"],
                 words=words
             )
         )
 
     else:
-        # auto-muted after MAX_WARNS warns
-        await message.reply(
-            text=s.ACCESS_RESTRICTED.format(
+        # auto-muted after the chat's warn limit
+        _reply_later(
+            message,
+            s.ACCESS_RESTRICTED.format(
                 first_name=user.first_name,
-                warnings=MAX_WARNS,
-                max_warns=MAX_WARNS,
+                warnings=result["max_warns"],
+                max_warns=result["max_warns"],
                 duration=result["duration"],
                 mute_count=result["mute_count"],
                 words=words
             )
         )
-
-    await session.commit()
-
-    try:
-        await message.delete()
-
-    except Exception:
-        logger.debug(
-            f"Could not delete message with profanity in chat {message.chat.id}"
-        )
\ No newline at end of file
@@ -1,3 +1,5 @@
+from functools import partial
+
 from aiogram import types, Router, F
 from aiogram.filters.command import CommandObject, Command
 
@@ -6,7 +8,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 import locales.group as s
 from config.config import MAX_WARNS
 
+from database.engine import after_commit
 from database.requests import create_user, set_log_chat, unset_log_chat
+from services.settings_service import invalidate_chat_settings
 
 from filters.group_filters import IsAdmin
 from filters.chat_filters import ChatTypeFilter
@@ -32,8 +36,6 @@ async def delete_system_message(message: types.Message, session: AsyncSession):
         if not message.left_chat_member.is_bot:
             await create_user(session, message.left_chat_member.id, message.chat.id)
 
-    await session.commit()
-
     try:
         await message.delete()
 
@@ -60,6 +62,8 @@ async def set_admin_chat(
             await unset_log_chat(session, message.chat.id)
             await message.reply(s.SUCCESS_UNSET_CHAT)
 
+        after_commit(session, partial(invalidate_chat_settings, message.chat.id))
+
     except ValueError as e:
         if action == "set_admin_chat":
             await message.reply(s.ALREADY_CONFIGURED)
@@ -71,10 +75,9 @@ async def set_admin_chat(
 
     except Exception:
         logger.exception(f"Failed to {action} for chat {message.chat.id}")
+        await session.rollback()
         await message.reply(s.SYSTEM_ERROR)
 
-    await session.commit()
-
 
 @system_router.my_chat_member()
 async def on_bot_added_to_group(event: types.ChatMemberUpdated):
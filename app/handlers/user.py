@@ -29,7 +29,7 @@ async def stats_cmd(message: types.Message, session: AsyncSession):
     )
 
     await message.reply(
-        sSTATS_TEXT.format(
+        s.STATS_TEXT.format(
             user_id=stats["user_id"],
             user_fullname=user.full_name,
             count_messages=stats["count_messages"],
@@ -4,4 +4,5 @@ from .warns import *
 from .filters import *
 from .captcha import *
 from .report import *
-from .system import *
\ No newline at end of file
+from .system import *
+from .export import *
\ No newline at end of file
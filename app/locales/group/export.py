@@ -0,0 +1,9 @@
+EXPORT_USAGE = "⚠️ <b>Invalid Format:</b> <code>/export_history [csv|jsonl] [ban|mute|warn] [gz]</code>"
+
+EXPORT_NO_RECORDS = "📋 <b>Export:</b> <i>No records found.</i>"
+
+EXPORT_CAPTION = "📦 <b>History Export:</b> <code>{rows}</code> records."
+
+EXPORT_TOO_LARGE = "⚠️ <b>Notice:</b> The export is {size} MB, over the 50 MB upload limit. Add <code>gz</code> to compress it or narrow it to one action."
+
+EXPORT_FAILED = "🚨 <b>System Error:</b> Failed to export the history."
@@ -3,6 +3,7 @@ SYSTEM_ERROR = "🚨 <b>System Error:</b> <i>Something went wrong. Please contac
 DURATION_TEXT = "\n⏳ <b>Duration:</b> <code>{duration}</code>"
 NOTICE_REPLY = "⚠️ <b>Notice:</b> This command must be used as a <b>reply</b> to a message."
 NOT_REPLY_TO_MESSAGE = "❌ <b>Error:</b> Please provide a duration or <b>reply</b> to a target message."
+USER_NOT_FOUND = "⚠️ <b>Notice:</b> User <code>{username}</code> has not been seen in this chat yet. <b>Reply</b> to their message or use their ID."
 INVALID_FORMAT = "⚠️ <b>Invalid Format:</b> Please use formats like <code>10m</code>, <code>1h</code>, <code>1d</code>, or <code>permanent</code>."
 REASON_BLOCK = "\n📝 <b>Description:</b> <i>{reason}</i>"
 ACTION_USER = (
@@ -14,6 +15,7 @@ ACTION_USER = (
 
 # logs
 REASON_LOG_TEXT = "\n📝 <b>Reason:</b> <i>{reason}</i>"
+MESSAGE_LOG_TEXT = "\n💬 <b>Message:</b> <i>{text}</i>"
 MODERATION_LOG = (
     "🛡 <b>Moderation Log Entry</b>\n"
     "━━━━━━━━━━━━━━━━━━\n"
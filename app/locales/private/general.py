@@ -54,8 +54,8 @@ COMMANDS_TEXT = (
     "• <code>/unmute</code> - Unmute user (reply/ID).\n"
     "• <code>/ban</code> - Ban user (reply/ID).\n"
     "• <code>/unban</code> - Unban user (reply/ID).\n"
-    "• <code>/addfilter</code> - Add word to profanity filter.\n"
-    "• <code>/removefilter</code> - Remove word from profanity filter.\n"
+    "• <code>/addfilter</code> - Add word to the chat's profanity filter.\n"
+    "• <code>/removefilter</code> - Remove word from the chat's profanity filter.\n"
     "• <code>/mute_list</code> - History of mutes.\n"
     "• <code>/ban_list</code> - History of bans.\n\n"
     "<b>👤 User Commands:</b>\n"
@@ -0,0 +1,25 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import ChatMemberUpdated
+
+from services.admin_service import admin_roster
+
+
+class AdminRosterMiddleware(BaseMiddleware):
+    """
+    Feeds chat_member and my_chat_member updates into the administrator roster
+    before any handler sees them, whether or not a handler matches.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[ChatMemberUpdated, Dict[str, Any]], Awaitable[Any]],
+        event: ChatMemberUpdated,
+        data: Dict[str, Any],
+    ) -> Any:
+
+        if isinstance(event, ChatMemberUpdated):
+            admin_roster.update(data["bot"], event)
+
+        return await handler(event, data)
@@ -0,0 +1,328 @@
+import asyncio
+import time
+
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from config.config import (
+    API_CHAT_BURST,
+    API_CHAT_RATE,
+    API_GLOBAL_BURST,
+    API_GLOBAL_RATE,
+    API_MAX_RETRIES,
+    API_METRICS_INTERVAL,
+)
+
+from loguru import logger
+
+
+class Priority(IntEnum):
+    # deletes and restrictions that protect the chat
+    URGENT = 0
+    # replies and everything else the handlers send
+    REPLY = 1
+    # admin-log traffic
+    LOG = 2
+
+
+_URGENT_METHODS = {
+    "deleteMessage",
+    "deleteMessages",
+    "restrictChatMember",
+    "banChatMember",
+    "unbanChatMember",
+}
+
+# methods counted against the per-chat message limit; edits, e.g. of list pages, are not
+_CHAT_LIMITED_PREFIXES = ("send", "forward", "copy")
+
+_priority: ContextVar[Priority | None] = ContextVar("api_priority", default=None)
+
+
+@contextmanager
+def api_priority(priority: Priority):
+    """
+    Sends the requests made inside the block with the given priority,
+    e.g. to queue admin-log messages behind everything else.
+    """
+
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated", "paused_until")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+        self.paused_until = 0.0
+
+
+    def delay(self, now: float) -> float:
+        """
+        Seconds until a token is available, 0 if one is available now.
+        """
+
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        wait = max(0.0, self.paused_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+
+        return wait
+
+
+    def take(self):
+        self.tokens -= 1
+
+
+    def pause(self, until: float):
+        self.paused_until = max(self.paused_until, until)
+
+
+class ApiScheduler(BaseRequestMiddleware):
+    """
+    Session middleware that queues outgoing chat requests and releases them
+    through a global token bucket and per-chat buckets for messages sent to groups.
+    Waiting requests are released by priority, and within a priority in arrival order,
+    skipping requests whose chat is still limited. Requests answered with RetryAfter
+    pause their chat (or the whole bot) and are queued again, up to max_retries times.
+    Requests without a chat, like getUpdates, bypass the queue.
+    """
+
+    def __init__(
+        self,
+        global_rate: float,
+        global_burst: float,
+        chat_rate: float,
+        chat_burst: float,
+        max_retries: int,
+        metrics_interval: float,
+    ):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.metrics_interval = metrics_interval
+
+        now = time.monotonic()
+        self._global = TokenBucket(global_rate, global_burst, now)
+        self._chats: dict[int | str, TokenBucket] = {}
+
+        # per priority: (chat bucket key or None, future released by the dispatcher)
+        self._queues: dict[Priority, deque[tuple[int | str | None, asyncio.Future]]] = {
+            priority: deque() for priority in Priority
+        }
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._metrics_task: asyncio.Task | None = None
+
+        self.sent = {priority: 0 for priority in Priority}
+        self.retried = 0
+        self.max_wait = 0.0
+
+
+    def start(self):
+        if not self._task:
+            self._task = asyncio.create_task(self._dispatch())
+            self._metrics_task = asyncio.create_task(self._report_metrics())
+
+
+    async def shutdown(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+        if self._metrics_task:
+            self._metrics_task.cancel()
+            self._metrics_task = None
+
+        # let the remaining requests through unthrottled
+        for queue in self._queues.values():
+            while queue:
+                _, future = queue.popleft()
+                if not future.done():
+                    future.set_result(None)
+
+
+    def metrics(self) -> dict:
+        return {
+            "queued": {priority.name.lower(): len(queue) for priority, queue in self._queues.items()},
+            "sent": {priority.name.lower(): count for priority, count in self.sent.items()},
+            "retried": self.retried,
+            "max_wait": round(self.max_wait, 3),
+            "limited_chats": len(self._chats),
+        }
+
+
+    async def _report_metrics(self):
+        """
+        Logs the queue depths and counters every metrics_interval seconds,
+        skipping intervals in which nothing was sent.
+        """
+
+        last_sent = 0
+
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+
+            sent = sum(self.sent.values())
+            if sent == last_sent:
+                continue
+
+            last_sent = sent
+            logger.info(f"API scheduler: {self.metrics()}")
+
+
+    def _bucket(self, chat_id: int | str, now: float) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+
+        if not bucket:
+            # forget chats whose buckets have refilled completely
+            if len(self._chats) >= 10000:
+                self._chats = {
+                    key: b for key, b in self._chats.items()
+                    if b.delay(now) > 0 or b.tokens < b.capacity
+                }
+
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst, now)
+
+        return bucket
+
+
+    def _release_next(self, now: float) -> float | None:
+        """
+        Releases the first request that may be sent now.
+        Returns None if one was released, otherwise how long to wait (inf if the queue is empty).
+        """
+
+        global_wait = self._global.delay(now)
+        wait = float("inf")
+
+        for priority, queue in self._queues.items():
+            for entry in queue:
+                chat_key, future = entry
+
+                if future.done():
+                    # the caller was cancelled
+                    queue.remove(entry)
+                    return None
+
+                chat_wait = self._bucket(chat_key, now).delay(now) if chat_key is not None else 0.0
+                entry_wait = max(global_wait, chat_wait)
+
+                if entry_wait == 0:
+                    self._global.take()
+                    if chat_key is not None:
+                        self._chats[chat_key].take()
+
+                    queue.remove(entry)
+                    future.set_result(None)
+                    self.sent[priority] += 1
+                    return None
+
+                wait = min(wait, entry_wait)
+
+        return wait
+
+
+    async def _dispatch(self):
+        while True:
+            wait = self._release_next(time.monotonic())
+
+            if wait is None:
+                continue
+
+            self._wakeup.clear()
+
+            try:
+                # a new request may be sendable before the current ones
+                await asyncio.wait_for(self._wakeup.wait(), timeout=None if wait == float("inf") else wait)
+            except asyncio.TimeoutError:
+                pass
+
+
+    async def _acquire(self, priority: Priority, chat_key: int | str | None):
+        if not self._task:
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues[priority].append((chat_key, future))
+        self._wakeup.set()
+
+        started = time.monotonic()
+        await future
+        self.max_wait = max(self.max_wait, time.monotonic() - started)
+
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, "chat_id", None)
+        name = method.__api_method__
+
+        if chat_id is None or name.startswith("get"):
+            return await make_request(bot, method)
+
+        if name in _URGENT_METHODS:
+            priority = Priority.URGENT
+        elif _priority.get() is not None:
+            priority = _priority.get()
+        else:
+            priority = Priority.REPLY
+
+        # the per-chat limit only applies to groups and channels, private chats have positive ids
+        is_private = isinstance(chat_id, int) and chat_id > 0
+        chat_key = chat_id if name.startswith(_CHAT_LIMITED_PREFIXES) and not is_private else None
+
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(priority, chat_key)
+
+            try:
+                return await make_request(bot, method)
+
+            except TelegramRetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+
+                self.retried += 1
+                logger.warning(f"{name} to chat {chat_id} flood-limited, retrying in {e.retry_after}s")
+
+                until = time.monotonic() + e.retry_after
+                if chat_key is not None:
+                    self._bucket(chat_key, time.monotonic()).pause(until)
+                else:
+                    self._global.pause(until)
+
+                if not self._task:
+                    await asyncio.sleep(e.retry_after)
+
+
+api_scheduler = ApiScheduler(
+    global_rate=API_GLOBAL_RATE,
+    global_burst=API_GLOBAL_BURST,
+    chat_rate=API_CHAT_RATE,
+    chat_burst=API_CHAT_BURST,
+    max_retries=API_MAX_RETRIES,
+    metrics_interval=API_METRICS_INTERVAL,
+)
@@ -3,10 +3,48 @@ from typing import Any, Awaitable, Callable, Dict
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
 
-from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from loguru import logger
+
+
+class LazySession:
+    """
+    Stands in for an AsyncSession and only creates the real one when a handler first uses it,
+    so updates that never query the database do not build or close a session at all.
+    """
+
+    __slots__ = ("_session_pool", "_session")
+
+    def __init__(self, session_pool: async_sessionmaker):
+        self._session_pool = session_pool
+        self._session: AsyncSession | None = None
+
+
+    @property
+    def started(self) -> bool:
+        return self._session is not None
+
+
+    def __getattr__(self, name: str) -> Any:
+        if self._session is None:
+            self._session = self._session_pool()
+
+        return getattr(self._session, name)
+
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
 
 
 class DbSessionMiddleware(BaseMiddleware):
+    """
+    Gives every update a session, committed once after the whole handler chain succeeds
+    and rolled back if it raises, so handlers never commit themselves.
+    """
+
     def __init__(self, session_pool: async_sessionmaker):
         self.session_pool = session_pool
 
@@ -16,6 +54,27 @@ class DbSessionMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: Dict[str, Any],
     ) -> Any:
-        async with self.session_pool() as session:
-            data["session"] = session
-            return await handler(event, data)
+        session = LazySession(self.session_pool)
+        data["session"] = session
+
+        try:
+            result = await handler(event, data)
+
+            if session.started and session.in_transaction():
+                await session.commit()
+
+                for callback in session.info.pop("after_commit", ()):
+                    try:
+                        callback()
+                    except Exception:
+                        logger.exception("After-commit callback failed")
+
+            return result
+
+        except Exception:
+            if session.started:
+                await session.rollback()
+            raise
+
+        finally:
+            await session.close()
@@ -0,0 +1,24 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import ChatMemberUpdated
+
+from database.members import member_status
+
+
+class MemberStatusMiddleware(BaseMiddleware):
+    """
+    Mirrors the new status carried by every chat_member update, whether or not a handler matches.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[ChatMemberUpdated, Dict[str, Any]], Awaitable[Any]],
+        event: ChatMemberUpdated,
+        data: Dict[str, Any],
+    ) -> Any:
+
+        if isinstance(event, ChatMemberUpdated):
+            member_status.record_member(event.chat.id, event.new_chat_member)
+
+        return await handler(event, data)
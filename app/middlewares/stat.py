@@ -1,9 +1,7 @@
-from datetime import datetime
 from typing import Any, Awaitable, Callable, Dict
 from aiogram import BaseMiddleware
 from aiogram.types import Message
-from sqlalchemy import update
-from database.models import User
+from database.counters import message_counter
 
 class MessageCounterMiddleware(BaseMiddleware):
     async def __call__(
@@ -14,20 +12,7 @@ class MessageCounterMiddleware(BaseMiddleware):
     ) -> Any:
         
         if isinstance(event, Message) and event.from_user and not event.from_user.is_bot:
-            session = data.get("session")
-            if session:
-                user = await session.get(User, (event.from_user.id, event.chat.id))
-                if user:
-                    user.count_messages = (user.count_messages or 0) + 1
-                else:
-                    new_user = User(
-                        id=event.from_user.id, 
-                        chat_id=event.chat.id, 
-                        count_messages=1,
-                        join_date=datetime.now()
-                    )
-                    session.add(new_user)
-                
-                await session.commit()
+            # buffered and written in batches, see database.counters
+            message_counter.add(event.from_user.id, event.chat.id)
 
         return await handler(event, data)
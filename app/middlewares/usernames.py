@@ -0,0 +1,30 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import ChatMemberUpdated, Message, TelegramObject
+
+from database.usernames import username_index
+
+
+class UsernameIndexMiddleware(BaseMiddleware):
+    """
+    Feeds the users of group messages and member updates into the username index.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+
+        if event.chat.type in ("group", "supergroup"):
+            if isinstance(event, Message):
+                for user in (event.from_user, getattr(event.reply_to_message, "from_user", None)):
+                    if user:
+                        username_index.see(event.chat.id, user)
+
+            elif isinstance(event, ChatMemberUpdated):
+                username_index.see(event.chat.id, event.new_chat_member.user)
+
+        return await handler(event, data)
@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+from collections import OrderedDict
+
+from aiogram import Bot, types
+
+from config.config import ADMIN_ROSTER_CACHE_SIZE, ADMIN_ROSTER_TTL
+
+from loguru import logger
+
+
+ADMIN_STATUSES = ("creator", "administrator")
+
+
+class AdminRoster:
+    """
+    Per-chat set of administrator ids, loaded with a single get_chat_administrators call
+    and kept current from chat_member and my_chat_member updates in between.
+    Concurrent lookups of a chat whose roster is missing share one API call.
+    """
+
+    def __init__(self, ttl: float, size: int):
+        self.ttl = ttl
+        self.size = size
+
+        # chat_id -> (expires at, admin ids), least recently used first
+        self._rosters: OrderedDict[int, tuple[float, set[int]]] = OrderedDict()
+        self._loading: dict[int, asyncio.Task] = {}
+
+        # chat_id -> counter bumped by the chat's member updates while its roster is loading,
+        # so a roster loaded concurrently is not cached stale
+        self._generations: dict[int, int] = {}
+
+        self.loads = 0
+        self.failed_loads = 0
+
+
+    async def _load(self, bot: Bot, chat_id: int) -> set[int]:
+        self._generations[chat_id] = 0
+
+        try:
+            administrators = await bot.get_chat_administrators(chat_id)
+        finally:
+            generation = self._generations.pop(chat_id)
+
+        admins = {member.user.id for member in administrators}
+        self.loads += 1
+
+        if generation == 0:
+            self._rosters[chat_id] = (time.monotonic() + self.ttl, admins)
+            self._rosters.move_to_end(chat_id)
+
+            while len(self._rosters) > self.size:
+                self._rosters.popitem(last=False)
+
+        return admins
+
+
+    async def get(self, bot: Bot, chat_id: int) -> set[int]:
+        """
+        Returns the ids of the chat's administrators, calling the API only when the roster
+        is missing or older than the TTL. The returned set must not be modified.
+        """
+
+        cached = self._rosters.get(chat_id)
+        if cached and cached[0] > time.monotonic():
+            self._rosters.move_to_end(chat_id)
+            return cached[1]
+
+        task = self._loading.get(chat_id)
+
+        if not task:
+            task = asyncio.create_task(self._load(bot, chat_id))
+            self._loading[chat_id] = task
+            task.add_done_callback(lambda _: self._loading.pop(chat_id, None))
+
+        # one cancelled handler must not cancel the load the others wait for
+        return await asyncio.shield(task)
+
+
+    async def is_admin(self, bot: Bot, chat_id: int, user_id: int) -> bool:
+        try:
+            return user_id in await self.get(bot, chat_id)
+
+        except Exception as e:
+            # the roster could not be loaded, ask about this one member instead
+            self.failed_loads += 1
+            logger.debug(f"Could not load administrators of chat {chat_id}: {e}")
+
+        member = await bot.get_chat_member(chat_id, user_id)
+        return member.status in ADMIN_STATUSES
+
+
+    def update(self, bot: Bot, event: types.ChatMemberUpdated):
+        """
+        Applies a chat_member or my_chat_member update to the roster of its chat, if loaded.
+        """
+
+        chat_id = event.chat.id
+        member = event.new_chat_member
+
+        if chat_id in self._generations:
+            self._generations[chat_id] += 1
+
+        if member.user.id == bot.id and member.status in ("left", "kicked"):
+            self._rosters.pop(chat_id, None)
+            return
+
+        cached = self._rosters.get(chat_id)
+        if not cached:
+            return
+
+        if member.status in ADMIN_STATUSES:
+            cached[1].add(member.user.id)
+        else:
+            cached[1].discard(member.user.id)
+
+
+admin_roster = AdminRoster(ttl=ADMIN_ROSTER_TTL, size=ADMIN_ROSTER_CACHE_SIZE)
@@ -5,6 +5,7 @@ from aiogram import Bot, types
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.config import permissions_mute, permissions_unmute
+from database.members import member_status
 
 from services.log_service import send_log
 
@@ -25,6 +26,7 @@ class CaptchaService:
         await self.bot.restrict_chat_member(
             chat_id=chat_id, user_id=user_id, permissions=permissions_mute
         )
+        member_status.record(chat_id, user_id, "restricted", can_send_messages=False)
 
 
     async def verify_user(self, chat_id: int, user: types.User):
@@ -37,6 +39,7 @@ class CaptchaService:
             user_id=user.id,
             permissions=permissions_unmute,
         )
+        member_status.forget(chat_id, user.id)
         logger.info(f"User {user.id} passed captcha in chat {chat_id}")
 
 
@@ -45,11 +48,14 @@ class CaptchaService:
         Bans the user for 1 hour if they fail to pass the captcha in time.
         """
 
+        until_date = datetime.now() + timedelta(hours=1)
+
         await self.bot.ban_chat_member(
             chat_id=chat.id,
             user_id=user.id,
-            until_date=datetime.now() + timedelta(hours=1),
+            until_date=until_date,
         )
+        member_status.record(chat.id, user.id, "kicked", False, until_date)
 
         await send_log(
             bot=self.bot,
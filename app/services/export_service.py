@@ -0,0 +1,129 @@
+import csv
+import gzip
+import io
+import json
+
+from datetime import datetime
+from tempfile import SpooledTemporaryFile
+from typing import AsyncGenerator
+
+from aiogram import Bot
+from aiogram.types import InputFile
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.config import EXPORT_BATCH, EXPORT_SPOOL_SIZE
+from database.models import ModerationAction
+from database.requests import stream_history
+
+
+EXPORT_FORMATS = ("csv", "jsonl")
+
+EXPORT_FIELDS = ("id", "time", "user_id", "name", "action", "duration", "reason")
+
+
+class NoRecordsExport(Exception):
+    pass
+
+
+class SpooledInputFile(InputFile):
+    """
+    Uploads a spooled temporary file chunk by chunk, whether it is still in memory or on disk,
+    and closes it once it has been sent.
+    """
+
+    def __init__(self, file: SpooledTemporaryFile, filename: str):
+        super().__init__(filename=filename)
+        self.file = file
+
+        self.file.seek(0, io.SEEK_END)
+        self.size = self.file.tell()
+
+
+    async def read(self, bot: Bot) -> AsyncGenerator[bytes, None]:
+        self.file.seek(0)
+
+        while chunk := self.file.read(self.chunk_size):
+            yield chunk
+
+
+    def close(self):
+        self.file.close()
+
+
+_ACTION_NAMES = {action.value: action.name.lower() for action in ModerationAction}
+
+
+def _values(row) -> tuple:
+    """
+    Values of one history row in the order of EXPORT_FIELDS.
+    duration is in seconds, empty for permanent restrictions and warnings.
+    """
+
+    return (
+        row.id,
+        datetime.fromtimestamp(row.time).isoformat(sep=" "),
+        row.user_id,
+        row.name,
+        _ACTION_NAMES[row.action],
+        row.duration,
+        row.reason,
+    )
+
+
+async def export_history(
+    session: AsyncSession,
+    chat_id: int,
+    fmt: str = "csv",
+    action: ModerationAction | None = None,
+    compress: bool = False,
+) -> tuple[SpooledInputFile, int]:
+    """
+    Writes the moderation history of a chat to a spooled temporary file as CSV or JSONL,
+    one database batch at a time, so memory use stays the same for any number of rows.
+    Returns the file ready to be sent as a document and the number of exported rows.
+    """
+
+    spool = SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE)
+    binary = gzip.GzipFile(fileobj=spool, mode="wb", compresslevel=6) if compress else spool
+    # newline="" leaves line endings to the csv module
+    text = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+
+    rows = 0
+
+    try:
+        if fmt == "csv":
+            writer = csv.writer(text)
+            writer.writerow(EXPORT_FIELDS)
+
+        async for batch in stream_history(session, chat_id, action, batch_size=EXPORT_BATCH):
+            values = map(_values, batch)
+
+            if fmt == "csv":
+                writer.writerows(values)
+            else:
+                text.writelines(
+                    json.dumps(dict(zip(EXPORT_FIELDS, v)), ensure_ascii=False) + "\n" for v in values
+                )
+
+            rows += len(batch)
+
+        # detach instead of close: closing the wrapper would close the spool as well
+        text.flush()
+        text.detach()
+
+        if compress:
+            binary.close()
+
+    except BaseException:
+        spool.close()
+        raise
+
+    if not rows:
+        spool.close()
+        raise NoRecordsExport
+
+    scope = ModerationAction(action).name.lower() if action else "all"
+    filename = f"history_{chat_id}_{scope}_{datetime.now():%Y%m%d_%H%M}.{fmt}"
+
+    return SpooledInputFile(spool, filename + ".gz" if compress else filename), rows
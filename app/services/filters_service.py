@@ -1,15 +1,31 @@
-import re
-from config.config import BAD_WORDS_FILE
+from collections import OrderedDict
+from itertools import count
 
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.config import CHAT_MATCHER_CACHE_SIZE
+from database.requests import (
+    get_chat_filter_words,
+    set_chat_filter_word,
+    delete_chat_filter_word,
+)
+from database.word_store import ban_word_store, extract_word
+from utils.matcher import BadWordMatcher, ChatMatcher
+from utils.text import (
+    BadWordDictionary,
+    get_dictionary,
+    normalize,
+    normalize_bad_words,
+)
 
-def _extract_word(line: str) -> str:
-    """
-    Normalize a word by removing special characters and converting to lowercase.
-    """
 
-    stripped = line.strip()
-    word = re.sub(r"[^а-яa-z0-9]", "", stripped.lower())
-    return word
+# chat_id -> (global dictionary version, compiled matcher), least recently used first
+_chat_matchers: OrderedDict[int, tuple[int, BadWordMatcher | ChatMatcher]] = OrderedDict()
+
+# chat_id -> token of the loads in flight for the chat; an invalidation drops it,
+# so a matcher loaded concurrently is not cached stale, and other chats are not affected
+_chat_matcher_loads: dict[int, int] = {}
+_load_tokens = count(1)
 
 
 def _word_exists(target_word: str, lines: list) -> bool:
@@ -17,56 +33,127 @@ def _word_exists(target_word: str, lines: list) -> bool:
     Check if a word exists in the bad words list, ignoring special characters and formatting.
     """
 
-    target = _extract_word(target_word)
+    target = extract_word(target_word)
     for line in lines:
-        if _extract_word(line) == target:
+        if extract_word(line) == target:
             return True
-        
+
     return False
 
 
-async def add_filter_word(word: str) -> bool:
+def _build_chat_matcher(
+    dictionary: BadWordDictionary, additions: list[str], exemptions: list[str]
+) -> BadWordMatcher | ChatMatcher:
+    """
+    Compiles the effective matcher of a chat on top of the global dictionary.
+    """
+
+    if not additions and not exemptions:
+        return dictionary.matcher
+
+    # the exempted words and every list entry spelled the same, compared by their patterns
+    exempt_patterns = {
+        normalize(word)
+        for exemption in exemptions
+        for word in (exemption, *ban_word_store.entries(exemption))
+    }
+
+    return ChatMatcher(
+        dictionary.matcher,
+        normalize_bad_words(additions),
+        exempt_patterns,
+        normalize,
+    )
+
+
+async def get_chat_matcher(session: AsyncSession, chat_id: int) -> BadWordMatcher | ChatMatcher:
     """
-    Add a new word to the profanity filter list.
+    Returns the compiled profanity filter of a chat, loading it from the database on a cache miss.
     """
 
+    dictionary = get_dictionary()
+
+    cached = _chat_matchers.get(chat_id)
+    if cached and cached[0] == dictionary.version:
+        _chat_matchers.move_to_end(chat_id)
+        return cached[1]
+
+    load = _chat_matcher_loads.setdefault(chat_id, next(_load_tokens))
+
     try:
-        with open(BAD_WORDS_FILE, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
+        additions, exemptions = await get_chat_filter_words(session, chat_id)
+    finally:
+        current = _chat_matcher_loads.get(chat_id)
+        if current == load:
+            del _chat_matcher_loads[chat_id]
+
+    matcher = _build_chat_matcher(dictionary, additions, exemptions)
+
+    if current == load:
+        _chat_matchers[chat_id] = (dictionary.version, matcher)
+        _chat_matchers.move_to_end(chat_id)
+
+        while len(_chat_matchers) > CHAT_MATCHER_CACHE_SIZE:
+            _chat_matchers.popitem(last=False)
 
-        if _word_exists(word, lines):
-            return False
+    return matcher
 
-        with open(BAD_WORDS_FILE, 'r', encoding='utf-8') as f:
-            content = f.read()
 
-        with open(BAD_WORDS_FILE, 'w', encoding='utf-8') as f:
-            f.write(word.lower() + '\n' + content)
+def invalidate_chat_matcher(chat_id: int):
+    """
+    Drops the cached matcher of a chat. Call after its filter changes are committed.
+    """
+
+    _chat_matcher_loads.pop(chat_id, None)
+    _chat_matchers.pop(chat_id, None)
+
+
+async def add_chat_filter_word(session: AsyncSession, chat_id: int, word: str) -> bool:
+    """
+    Adds a word to the profanity filter of one chat.
+    Returns False if the chat already filters this word.
+    """
+
+    target = extract_word(word)
+    if not target:
+        return False
 
+    additions, exemptions = await get_chat_filter_words(session, chat_id)
+
+    # the word is in the global list but was exempted here: lift the exemption
+    exempted = [w for w in exemptions if extract_word(w) == target]
+    if exempted:
+        for w in exempted:
+            await delete_chat_filter_word(session, chat_id, w)
         return True
-    
-    except Exception:
+
+    if ban_word_store.contains(word) or _word_exists(word, additions):
         return False
-    
 
-async def remove_filter_word(word: str) -> bool:
+    await set_chat_filter_word(session, chat_id, word.lower(), is_exempt=False)
+    return True
+
+
+async def remove_chat_filter_word(session: AsyncSession, chat_id: int, word: str) -> bool:
     """
-    Remove a word from the profanity filter list.
+    Removes a word from the profanity filter of one chat.
+    Words from the global list are exempted for this chat only.
+    Returns False if the chat does not filter this word.
     """
 
-    try:
-        with open(BAD_WORDS_FILE, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-
-        if not _word_exists(word, lines):
-            return False
+    target = extract_word(word)
+    if not target:
+        return False
 
-        filtered_lines = [l for l in lines if _extract_word(l) != _extract_word(word)]
+    additions, exemptions = await get_chat_filter_words(session, chat_id)
 
-        with open(BAD_WORDS_FILE, 'w', encoding='utf-8') as f:
-            f.writelines(filtered_lines)
+    added = [w for w in additions if extract_word(w) == target]
+    for w in added:
+        await delete_chat_filter_word(session, chat_id, w)
 
+    if ban_word_store.contains(word) and not _word_exists(word, exemptions):
+        await set_chat_filter_word(session, chat_id, word.lower(), is_exempt=True)
         return True
-    
-    except Exception:
-        return False
\ No newline at end of file
+
+    return bool(added)
+
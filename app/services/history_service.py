@@ -1,5 +1,7 @@
 import math
 
+from datetime import datetime
+
 from html import escape
 
 from typing import Callable
@@ -10,8 +12,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 import locales.group as s
 
-from database.models import BanHistory, MuteHistory, WarnHistory
-from database.requests import get_history_list
+from database.models import ModerationAction, ModerationEvent
+from database.requests import count_history, get_history_list
 
 
 class NoRecordsBan(Exception):
@@ -26,114 +28,177 @@ class NoRecordsWarn(Exception):
     pass
 
 
+PER_PAGE = 10
+
+
 class Pagination(CallbackData, prefix="pag"):
     action: str
     page: int
+    current: bool = False
+
+    # keyset cursor: time and id of the event the page continues from
+    time: int | None = None
+    id: int | None = None
+    backward: bool = False
+
+
+def decode_cursor(time: int | None, record_id: int | None) -> tuple[int, int] | None:
+    if time is None or record_id is None:
+        return None
+
+    return time, record_id
+
+
+def describe_duration(event: ModerationEvent) -> str | None:
+    """
+    Human-readable length of a restriction, None for warnings.
+    """
+
+    if event.action == ModerationAction.WARN:
+        return None
+
+    if event.duration is None:
+        return "permanent"
+
+    until = datetime.fromtimestamp(event.time + event.duration)
+    return f"until {until.strftime('%Y-%m-%d %H:%M')}"
 
 
 class HistoryService:
-    def __init__(self, session: AsyncSession, history_scope: str):
+    def __init__(self, session: AsyncSession, chat_id: int, history_scope: str):
         self.session = session
+        self.chat_id = chat_id
         self.history_scope = history_scope
 
 
     async def _get_formatted_history(
         self,
         fetch_func: Callable,
-        model,
-        status_arg: str | None,
+        action: ModerationAction,
         header: str,
         exception_class: Exception,
         current: bool,
         page: int = 1,
+        cursor: tuple[int, int] | None = None,
+        backward: bool = False,
     ):
         """
-        Internal helper to fetch, sort, and format history records with pagination.
+        Internal helper to fetch and format one page of history records.
+        Pages are read with a (time, id) keyset cursor, so a page costs the same at any depth.
         """
 
-        records = await fetch_func(
-            session=self.session, current=current, model=model, status=status_arg
+        page_records = await fetch_func(
+            session=self.session,
+            action=action,
+            chat_id=self.chat_id,
+            current=current,
+            limit=PER_PAGE,
+            cursor=cursor,
+            backward=backward,
         )
 
-        if not records:
+        if not page_records:
             raise exception_class
 
-        records = sorted(records, key=lambda x: x.time, reverse=True)
-
-        PER_PAGE = 10
-        total_pages = math.ceil(len(records) / PER_PAGE)
-
-        start = (page - 1) * PER_PAGE
-        end = start + PER_PAGE
-        page_records = records[start:end]
+        total = await count_history(
+            session=self.session,
+            action=action,
+            chat_id=self.chat_id,
+            current=current,
+        )
+        total_pages = math.ceil(total / PER_PAGE)
 
         text = header.format(history_scope=self.history_scope)
 
-        for record in page_records:
-            date = record.time.strftime("%Y-%m-%d %H:%M")
-            reason_text = escape(record.reason) if model != WarnHistory and record.reason else "None"
-            name_text = escape(record.name) if record.name else "Unknown"
-            duration = record.duration if model != WarnHistory and record.duration else None
+        for event, name in page_records:
+            date = datetime.fromtimestamp(event.time).strftime("%Y-%m-%d %H:%M")
+            reason_text = escape(event.reason) if event.reason else "None"
+            name_text = escape(name) if name else "Unknown"
 
             text += s.LIST_RECORD.format(
                 name=name_text,
-                user_id=record.user_id,
+                user_id=event.user_id,
                 date=date,
-                duration=duration,
+                duration=describe_duration(event),
                 reason=reason_text,
             )
 
+        first, last = page_records[0][0], page_records[-1][0]
+
         return {
             "text": text,
             "has_next": page < total_pages,
             "has_prev": page > 1,
             "total_pages": total_pages,
+            "first": (first.time, first.id),
+            "last": (last.time, last.id),
         }
 
 
-    async def ban_history(self, current: bool, page: int = 1):
+    async def ban_history(
+        self,
+        current: bool,
+        page: int = 1,
+        cursor: tuple[int, int] | None = None,
+        backward: bool = False,
+    ):
         """
         Retrieves a paginated list of ban history records.
         """
 
         return await self._get_formatted_history(
             fetch_func=get_history_list,
-            model=BanHistory,
-            status_arg="is_banned",
+            action=ModerationAction.BAN,
             header=s.BAN_HISTORY_HEADER,
             exception_class=NoRecordsBan,
             page=page,
             current=current,
+            cursor=cursor,
+            backward=backward,
         )
 
 
-    async def mute_history(self, current: bool, page: int = 1):
+    async def mute_history(
+        self,
+        current: bool,
+        page: int = 1,
+        cursor: tuple[int, int] | None = None,
+        backward: bool = False,
+    ):
         """
         Retrieves a paginated list of mute history records.
         """
 
         return await self._get_formatted_history(
             fetch_func=get_history_list,
-            model=MuteHistory,
-            status_arg="is_muted",
+            action=ModerationAction.MUTE,
             header=s.MUTE_HISTORY_HEADER,
             exception_class=NoRecordsMute,
             page=page,
             current=current,
+            cursor=cursor,
+            backward=backward,
         )
 
 
-    async def warn_history(self, current: bool, page: int = 1):
+    async def warn_history(
+        self,
+        current: bool,
+        page: int = 1,
+        cursor: tuple[int, int] | None = None,
+        backward: bool = False,
+    ):
         """
         Retrieves a paginated list of warn history records.
         """
         
         return await self._get_formatted_history(
             fetch_func=get_history_list,
-            model=WarnHistory,
-            status_arg=None,
+            action=ModerationAction.WARN,
             header=s.WARN_HISTORY_HEADER,
             exception_class=NoRecordsWarn,
             page=page,
             current=current,
+            cursor=cursor,
+            backward=backward,
         )
\ No newline at end of file
@@ -1,14 +1,316 @@
+import asyncio
+
+from collections import OrderedDict
+from dataclasses import dataclass
 from html import escape
 from aiogram import types, Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from database.requests import get_log_chat
+from config.config import (
+    LOG_COALESCE_WINDOW,
+    LOG_QUEUE_SIZE,
+    LOG_RETRY_DELAYS,
+    LOG_WORKERS,
+)
+from middlewares.api_scheduler import Priority, api_priority
+from services.settings_service import get_chat_settings
 
 import locales.group as s
 
 from loguru import logger
 
-    
+
+# Telegram's limit for one message
+_MAX_MESSAGE_LENGTH = 4096
+
+# text of a logged message quoted when it could not be forwarded
+_EXCERPT_LENGTH = 500
+
+# messages deleted by the bot that are remembered until their log entry is queued
+_DELETED_MEMORY = 1000
+
+# delivery errors that a retry cannot fix, e.g. the bot was removed from the log chat
+_PERMANENT_ERRORS = (TelegramBadRequest, TelegramForbiddenError)
+
+
+@dataclass
+class LogEntry:
+    chat_id: int
+    # None when only the id was known, looked up when the entry is delivered
+    chat_title: str | None
+    first_name: str
+    user_id: int
+    action: str
+    duration: str | None
+    reason: str | None
+    # the logged message to forward, None when there is none or it was deleted
+    message_id: int | None
+    excerpt: str | None
+
+
+class LogQueue:
+    """
+    Delivers admin-log entries in the background, so moderation never waits for the log chat.
+    Entries for the same log chat that arrive within the coalescing window are sent as one message,
+    one batch per log chat at a time, and failed deliveries are retried after each of the retry delays.
+    The queue holds at most max_size entries: while it is full, new entries are dropped and counted.
+    """
+
+    def __init__(self, window: float, max_size: int, workers: int, retry_delays: tuple[float, ...]):
+        self.window = window
+        self.max_size = max_size
+        self.workers = workers
+        self.retry_delays = retry_delays
+
+        # log_chat_id -> entries waiting for the window to close
+        self._buffers: dict[int, list[LogEntry]] = {}
+        self._size = 0
+        # log chats whose window has closed
+        self._ready: asyncio.Queue[int] = asyncio.Queue()
+        # log_chat_id -> lock held while a batch is delivered, so batches arrive in order
+        self._delivering: dict[int, asyncio.Lock] = {}
+        self._titles: dict[int, str] = {}
+        self._deleted: OrderedDict[tuple[int, int], None] = OrderedDict()
+
+        self._bot: Bot | None = None
+        self._tasks: list[asyncio.Task] = []
+
+        self.delivered = 0
+        self.dropped = 0
+        self.failed = 0
+
+
+    @property
+    def started(self) -> bool:
+        return bool(self._tasks)
+
+
+    def start(self, bot: Bot):
+        self._bot = bot
+
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+
+    async def shutdown(self):
+        """
+        Sends everything still buffered without waiting for the windows, then stops the workers.
+        """
+
+        if not self._tasks:
+            return
+
+        for log_chat_id in list(self._buffers):
+            self._ready.put_nowait(log_chat_id)
+
+        try:
+            await asyncio.wait_for(self._ready.join(), timeout=10)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self._size} log entries were not delivered before shutdown")
+
+        for task in self._tasks:
+            task.cancel()
+
+        self._tasks = []
+
+
+    def put(self, log_chat_id: int, entry: LogEntry):
+        if self._size >= self.max_size:
+            self.dropped += 1
+
+            if self.dropped % 100 == 1:
+                logger.warning(f"Log queue is full, {self.dropped} entries dropped so far")
+            return
+
+        buffer = self._buffers.get(log_chat_id)
+
+        if buffer is None:
+            buffer = self._buffers[log_chat_id] = []
+            asyncio.get_running_loop().call_later(self.window, self._close_window, log_chat_id)
+
+        buffer.append(entry)
+        self._size += 1
+
+
+    def mark_deleted(self, chat_id: int, message_id: int):
+        """
+        Notes a message the bot has just deleted, so its log entry quotes the text
+        instead of trying to forward it.
+        """
+
+        self._deleted[(chat_id, message_id)] = None
+
+        while len(self._deleted) > _DELETED_MEMORY:
+            self._deleted.popitem(last=False)
+
+
+    def pop_deleted(self, chat_id: int, message_id: int) -> bool:
+        key = (chat_id, message_id)
+
+        if key not in self._deleted:
+            return False
+
+        del self._deleted[key]
+        return True
+
+
+    def _close_window(self, log_chat_id: int):
+        if log_chat_id in self._buffers:
+            self._ready.put_nowait(log_chat_id)
+
+
+    async def _worker(self):
+        while True:
+            log_chat_id = await self._ready.get()
+
+            try:
+                lock = self._delivering.setdefault(log_chat_id, asyncio.Lock())
+
+                # entries that arrive meanwhile join the next batch of this log chat
+                async with lock:
+                    entries = self._buffers.pop(log_chat_id, None)
+
+                    if entries:
+                        self._size -= len(entries)
+                        await self.deliver(self._bot, log_chat_id, entries)
+
+            except Exception:
+                logger.exception(f"Failed to deliver logs to chat {log_chat_id}")
+
+            finally:
+                self._ready.task_done()
+
+
+    async def _title(self, bot: Bot, entry: LogEntry) -> str:
+        if entry.chat_title is not None:
+            return entry.chat_title
+
+        title = self._titles.get(entry.chat_id)
+
+        if title is None:
+            try:
+                title = (await bot.get_chat(entry.chat_id)).title
+            except Exception:
+                title = f"ID: {entry.chat_id}"
+
+            if len(self._titles) >= 1000:
+                self._titles.clear()
+            self._titles[entry.chat_id] = title
+
+        return title
+
+
+    async def _forward(self, bot: Bot, log_chat_id: int, entries: list[LogEntry]) -> set[int]:
+        """
+        Forwards the logged messages, one request per source chat.
+        Returns the source chats whose messages could not all be forwarded, e.g. because
+        they were deleted in the meantime; their entries quote the message text instead.
+        """
+
+        sources: dict[int, set[int]] = {}
+        for entry in entries:
+            if entry.message_id:
+                sources.setdefault(entry.chat_id, set()).add(entry.message_id)
+
+        incomplete = set()
+
+        for chat_id, message_ids in sources.items():
+            try:
+                forwarded = await bot.forward_messages(
+                    chat_id=log_chat_id, from_chat_id=chat_id, message_ids=sorted(message_ids)
+                )
+                if len(forwarded) < len(message_ids):
+                    incomplete.add(chat_id)
+
+            except Exception as e:
+                logger.debug(f"Could not forward logged messages from chat {chat_id}: {e}")
+                incomplete.add(chat_id)
+
+        return incomplete
+
+
+    async def _format(self, bot: Bot, entry: LogEntry, quote: bool) -> str:
+        duration_text = (
+            s.DURATION_TEXT.format(duration=escape(entry.duration)) if entry.duration else ""
+        )
+
+        reason_text = s.REASON_LOG_TEXT.format(reason=escape(entry.reason)) if entry.reason else ""
+
+        if quote and entry.excerpt:
+            reason_text += s.MESSAGE_LOG_TEXT.format(text=escape(entry.excerpt))
+
+        return s.MODERATION_LOG.format(
+            first_name=escape(entry.first_name),
+            user_id=entry.user_id,
+            action=escape(entry.action),
+            duration_block=duration_text,
+            reason_block=reason_text,
+            chat_title=escape(await self._title(bot, entry)),
+        )
+
+
+    async def _send(self, bot: Bot, log_chat_id: int, text: str):
+        for delay in (*self.retry_delays, None):
+            try:
+                await bot.send_message(chat_id=log_chat_id, text=text)
+                return
+
+            except _PERMANENT_ERRORS:
+                raise
+
+            except Exception as e:
+                if delay is None:
+                    raise
+
+                logger.debug(f"Log delivery to chat {log_chat_id} failed ({e}), retrying in {delay}s")
+                await asyncio.sleep(delay)
+
+
+    async def deliver(self, bot: Bot, log_chat_id: int, entries: list[LogEntry]):
+        """
+        Sends entries to a log chat: their messages are forwarded first,
+        then the entries follow merged into as few messages as possible.
+        """
+
+        # queued behind the deletes, restrictions and replies of the moderation itself
+        with api_priority(Priority.LOG):
+            incomplete = await self._forward(bot, log_chat_id, entries)
+
+            texts = [
+                await self._format(
+                    bot, entry, quote=not entry.message_id or entry.chat_id in incomplete
+                )
+                for entry in entries
+            ]
+
+            chunks = []
+            for text in texts:
+                if chunks and len(chunks[-1]) + 2 + len(text) <= _MAX_MESSAGE_LENGTH:
+                    chunks[-1] += "\n\n" + text
+                else:
+                    chunks.append(text)
+
+            for chunk in chunks:
+                try:
+                    await self._send(bot, log_chat_id, chunk)
+
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(f"Failed to send log to chat {log_chat_id}: {e}")
+                    return
+
+        self.delivered += len(entries)
+        logger.debug(f"{len(entries)} log entries sent to chat {log_chat_id}")
+
+
+log_queue = LogQueue(
+    window=LOG_COALESCE_WINDOW,
+    max_size=LOG_QUEUE_SIZE,
+    workers=LOG_WORKERS,
+    retry_delays=LOG_RETRY_DELAYS,
+)
+
 
 async def send_log(
     bot: Bot,
@@ -21,56 +323,42 @@ async def send_log(
     message: types.Message = None,
 ):
     """
-    Sends a log entry to the admin log channel if configured
+    Queues a log entry for the admin log channel if configured.
+    Delivery happens in the background, see LogQueue.
     """
 
     if isinstance(chat, int):
         chat_id = chat
+        chat_title = None
 
     else:
         chat_id = chat.id
+        chat_title = chat.title
 
-    log_chat_id = await get_log_chat(session, chat_id)
+    log_chat_id = (await get_chat_settings(session, chat_id)).log_chat_id
     if not log_chat_id:
         return
 
-    if isinstance(chat, int):
-        try:
-            chat_obj = await bot.get_chat(chat)
-            chat_title = chat_obj.title
-            chat_id = chat
-
-        except Exception:
-            chat_title = f"ID: {chat}"
-            chat_id = chat
-
-    else:
-        chat_title = chat.title
-        chat_id = chat.id
-
-    duration_text = (
-        s.DURATION_TEXT.format(duration=escape(duration)) if duration else ""
-    )
+    content = (message.text or message.caption) if message else None
+    message_id = message.message_id if message else None
 
-    reason_text = s.REASON_LOG_TEXT.format(reason=escape(reason)) if reason else ""
+    # a deleted message can no longer be forwarded, its text is quoted instead
+    if message_id and log_queue.pop_deleted(chat_id, message_id) and content:
+        message_id = None
 
-    log_text = s.MODERATION_LOG.format(
-        first_name=escape(user.first_name),
+    entry = LogEntry(
+        chat_id=chat_id,
+        chat_title=chat_title,
+        first_name=user.first_name,
         user_id=user.id,
-        action=escape(action),
-        duration_block=duration_text,
-        reason_block=reason_text,
-        chat_title=escape(chat_title),
+        action=action,
+        duration=duration,
+        reason=reason,
+        message_id=message_id,
+        excerpt=content[:_EXCERPT_LENGTH] if content else None,
     )
 
-    try:
-        if message:
-            await bot.forward_message(
-                chat_id=log_chat_id, from_chat_id=chat_id, message_id=message.message_id
-            )
-
-        await bot.send_message(chat_id=log_chat_id, text=log_text)
-        logger.debug(f"Log sent to chat {log_chat_id} for user {user.id}")
-
-    except Exception as e:
-        logger.error(f"Failed to send log to chat {log_chat_id}: {e}")
+    if log_queue.started:
+        log_queue.put(log_chat_id, entry)
+    else:
+        await log_queue.deliver(bot, log_chat_id, [entry])
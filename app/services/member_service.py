@@ -0,0 +1,18 @@
+from aiogram import Bot
+
+from database.members import MemberStatus, member_status
+
+
+async def get_member_status(bot: Bot, chat_id: int, user_id: int) -> MemberStatus:
+    """
+    Returns the status of a chat member from the local mirror,
+    calling get_chat_member only when the mirror has no fresh entry.
+    """
+
+    status = await member_status.get(chat_id, user_id)
+
+    if status:
+        return status
+
+    member = await bot.get_chat_member(chat_id, user_id)
+    return member_status.record_member(chat_id, member)
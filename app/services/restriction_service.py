@@ -5,8 +5,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 
 from services.warning_service import get_mute_duration
+from services.admin_service import admin_roster
+from services.member_service import get_member_status
 from services.log_service import send_log
+from services.settings_service import get_chat_settings
 
+from database.members import member_status
 from database.requests import (
     add_mute,
     add_ban,
@@ -17,7 +21,7 @@ from database.requests import (
     unwarn_user,
 )
 
-from config.config import MAX_WARNS, permissions_mute, permissions_unmute
+from config.config import permissions_mute, permissions_unmute
 
 from loguru import logger
 
@@ -50,13 +54,13 @@ class RestrictionService:
     async def _get_target_member(self, chat_id: int, target_id: int):
         """
         Internal helper to retrieve chat member info and verify they aren't an admin.
+        The status comes from the local mirror when it is fresh.
         """
 
-        target = await self.bot.get_chat_member(chat_id, target_id)
-        if target.status in ("administrator", "creator"):
+        if await admin_roster.is_admin(self.bot, chat_id, target_id):
             raise PermissionError("Cannot restrict admin")
 
-        return target
+        return await get_member_status(self.bot, chat_id, target_id)
 
 
     async def mute(
@@ -74,9 +78,7 @@ class RestrictionService:
 
         target = await self._get_target_member(chat_id, user.id)
 
-        is_muted = target.status == "restricted" and not getattr(
-            target, "can_send_messages", True
-        )
+        is_muted = target.status == "restricted" and not target.can_send_messages
 
         if is_muted and not extend:
             raise AlreadyRestrictedError
@@ -87,6 +89,7 @@ class RestrictionService:
             permissions=permissions_mute,
             until_date=until_date,
         )
+        member_status.record(chat_id, user.id, "restricted", False, until_date)
 
         duration_str = (
             "permanent"
@@ -100,8 +103,6 @@ class RestrictionService:
             chat_id=chat_id,
             time=datetime.now(),
             name=user.full_name,
-            status="Muted",
-            duration_str=duration_str,
             until_date=until_date,
             reason=reason,
         )
@@ -136,6 +137,8 @@ class RestrictionService:
         await self.bot.restrict_chat_member(
             chat_id=chat_id, user_id=user.id, permissions=permissions_unmute
         )
+        # the chat_member update tells whether the user is a member or still partly restricted
+        member_status.forget(chat_id, user.id)
 
         await unmute_user(self.session, user.id, chat_id)
 
@@ -175,6 +178,7 @@ class RestrictionService:
             until_date=until_date,
             revoke_messages=True,
         )
+        member_status.record(chat_id, user.id, "kicked", False, until_date)
 
         duration_str = (
             "permanent"
@@ -188,8 +192,7 @@ class RestrictionService:
             chat_id=chat_id,
             time=datetime.now(),
             name=user.full_name,
-            status="Banned",
-            duration=duration_str,
+            until_date=until_date,
             reason=reason,
         )
 
@@ -220,6 +223,7 @@ class RestrictionService:
         await self.bot.unban_chat_member(
             chat_id=chat_id, user_id=user.id, only_if_banned=True
         )
+        member_status.forget(chat_id, user.id)
 
         await unban_user(self.session, user.id, chat_id)
 
@@ -243,19 +247,22 @@ class RestrictionService:
         reason: str | None = None,
     ):
         """
-        Issues a warning to a user, with auto-mute triggered after 3 warnings.
+        Issues a warning to a user, with auto-mute triggered once the chat's warn limit is reached.
         """
-        current_warns, mutes = await add_warn(self.session, user.id, chat_id)
+        settings = await get_chat_settings(self.session, chat_id)
+        max_warns = settings.max_warns
+
+        current_warns, mutes = await add_warn(self.session, user.id, chat_id, max_warns)
 
-        if current_warns < MAX_WARNS:
-            logger.info(f"Warning {current_warns}/{MAX_WARNS} issued to {user.id}")
+        if current_warns < max_warns:
+            logger.info(f"Warning {current_warns}/{max_warns} issued to {user.id}")
 
             await send_log(
                 bot=self.bot,
                 session=self.session,
                 chat=message.chat if message else chat_id,
                 user=user,
-                action=f"Warning ({current_warns}/{MAX_WARNS})",
+                action=f"Warning ({current_warns}/{max_warns})",
                 reason=reason,
                 message=message,
             )
@@ -266,12 +273,11 @@ class RestrictionService:
                 chat_id=chat_id,
                 time=datetime.now(),
                 name=user.full_name,
-                status="Warned",
             )
 
-            return {"status": "warned", "current_warns": current_warns}
+            return {"status": "warned", "current_warns": current_warns, "max_warns": max_warns}
 
-        duration = get_mute_duration(mutes)
+        duration = get_mute_duration(mutes, settings.mute_schedule)
         until_date = datetime.now() + duration
 
         await self.bot.restrict_chat_member(
@@ -280,6 +286,7 @@ class RestrictionService:
             permissions=permissions_mute,
             until_date=until_date,
         )
+        member_status.record(chat_id, user.id, "restricted", False, until_date)
 
         hours = int(duration.total_seconds() // 3600)
         days = hours // 24
@@ -290,7 +297,7 @@ class RestrictionService:
             session=self.session,
             chat=message.chat if message else chat_id,
             user=user,
-            action=f"Auto-Mute ({MAX_WARNS}/{MAX_WARNS} Warnings)",
+            action=f"Auto-Mute ({max_warns}/{max_warns} Warnings)",
             duration=duration_str,
             message=message,
         )
@@ -298,6 +305,7 @@ class RestrictionService:
         return {
             "status": "auto_muted",
             "current_warns": current_warns,
+            "max_warns": max_warns,
             "duration": duration_str,
             "mute_count": mutes,
             "until_date": until_date,
@@ -328,4 +336,10 @@ class RestrictionService:
             message=message,
         )
 
-        return {"status": "unwarned", "current_warns": current_warns}
\ No newline at end of file
+        settings = await get_chat_settings(self.session, chat_id)
+
+        return {
+            "status": "unwarned",
+            "current_warns": current_warns,
+            "max_warns": settings.max_warns,
+        }
\ No newline at end of file
@@ -0,0 +1,230 @@
+import asyncio
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from hashlib import blake2b
+
+from config.config import SCAN_CACHE_SIZE, SCAN_OFFLOAD_LENGTH, SCAN_POOL_SIZE
+from utils.matcher import BadWordMatcher, ChatMatcher
+from utils.text import LINK_PATTERN, ScanVerdict, get_dictionary, normalize
+
+from loguru import logger
+
+
+def _init_worker():
+    """
+    Compiles the ban-word dictionary once when a worker process starts.
+    """
+
+    get_dictionary()
+
+
+def _find_in_worker(text: str, return_normalized: bool) -> tuple[list[str], str | None]:
+    """
+    Normalizes a text and runs the global automaton over it inside a worker process.
+    The normalized text is sent back only when the caller asks for it, e.g. for a chat's additions.
+    """
+
+    normalized = normalize(text)
+    return get_dictionary().matcher.find_all(normalized), normalized if return_normalized else None
+
+
+class ScanCache:
+    """
+    Bounded LRU cache of the ban words found in a text, keyed by the matcher token
+    and a hash of the raw text, so repeated spam costs one lookup and no normalization.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+
+        self._entries: OrderedDict[tuple[int, bytes], list[str]] = OrderedDict()
+        self._version: int | None = None
+
+        self.hits = 0
+        self.misses = 0
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+    def key(self, matcher: BadWordMatcher | ChatMatcher, text: str) -> tuple[int, bytes]:
+        return matcher.token, blake2b(text.encode(), digest_size=16).digest()
+
+
+    def get(self, key: tuple[int, bytes]) -> list[str] | None:
+        # the ban-word list changed: nothing cached so far can be trusted
+        version = get_dictionary().version
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+        words = self._entries.get(key)
+
+        if words is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return words
+
+
+    def put(self, key: tuple[int, bytes], words: list[str]):
+        if self.size <= 0:
+            return
+
+        self._entries[key] = words
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+
+class ScanPool:
+    """
+    Scans long texts in a process pool so a burst of long posts does not block the event loop.
+    Short texts are still scanned inline, and texts seen recently are answered from the cache.
+    """
+
+    def __init__(self, workers: int, offload_length: int, cache_size: int):
+        self.workers = workers
+        self.offload_length = offload_length
+        self.cache = ScanCache(cache_size)
+
+        self._executor: ProcessPoolExecutor | None = None
+        self._version: int | None = None
+
+        self.inline_scans = 0
+        self.offloaded_scans = 0
+        self.failed_offloads = 0
+
+
+    def start(self):
+        """
+        Starts the worker processes and preloads the dictionary in each of them.
+        """
+
+        if self.workers <= 0 or self._executor:
+            return
+
+        self._version = get_dictionary().version
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker
+        )
+
+        for _ in range(self.workers):
+            self._executor.submit(_init_worker)
+
+        logger.info(
+            f"Scan pool started: {self.workers} workers for texts of {self.offload_length}+ chars"
+        )
+
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+            logger.info(f"Scan pool stopped: {self.stats()}")
+
+
+    def _restart(self):
+        """
+        Replaces the workers. Scans already submitted to the old pool still finish there.
+        """
+
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=False)
+            self._executor = None
+
+        self.start()
+
+
+    def stats(self) -> dict:
+        return {
+            "inline": self.inline_scans,
+            "offloaded": self.offloaded_scans,
+            "failed": self.failed_offloads,
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "cache_entries": len(self.cache),
+        }
+
+
+    def _get_executor(self) -> ProcessPoolExecutor | None:
+        # workers compiled an older dictionary: replace them after a reload
+        if self._executor and self._version != get_dictionary().version:
+            self._restart()
+
+        return self._executor
+
+
+    async def _find_all(self, matcher: BadWordMatcher | ChatMatcher, text: str) -> list[str]:
+        executor = self._get_executor() if len(text) >= self.offload_length else None
+
+        if not executor:
+            self.inline_scans += 1
+            return matcher.find_all(normalize(text))
+
+        # the worker normalizes the text too, so the event loop never walks a long text
+        chat_matcher = isinstance(matcher, ChatMatcher)
+
+        try:
+            loop = asyncio.get_running_loop()
+            bad_words, normalized = await loop.run_in_executor(
+                executor, _find_in_worker, text, chat_matcher
+            )
+
+        except BrokenProcessPool:
+            logger.exception("Scan worker died, scanning inline")
+            self.failed_offloads += 1
+            self._restart()
+
+            return matcher.find_all(normalize(text))
+
+        self.offloaded_scans += 1
+
+        if chat_matcher:
+            bad_words = matcher.refine(bad_words, normalized)
+
+        return bad_words
+
+
+    async def scan(
+        self,
+        text: str,
+        matcher: BadWordMatcher | ChatMatcher | None = None,
+        first_rule_only: bool = True,
+    ) -> ScanVerdict:
+        """
+        Same as scan_text, but texts over the offload length are matched in a worker process
+        and the ban words of recently seen texts come from the cache.
+        """
+
+        links = LINK_PATTERN.findall(text)
+
+        if links and first_rule_only:
+            return ScanVerdict.build(links, [])
+
+        if matcher is None:
+            matcher = get_dictionary().matcher
+
+        key = self.cache.key(matcher, text)
+
+        bad_words = self.cache.get(key)
+
+        if bad_words is None:
+            bad_words = await self._find_all(matcher, text)
+            self.cache.put(key, bad_words)
+
+        return ScanVerdict.build(links, bad_words)
+
+
+scan_pool = ScanPool(
+    workers=SCAN_POOL_SIZE,
+    offload_length=SCAN_OFFLOAD_LENGTH,
+    cache_size=SCAN_CACHE_SIZE,
+)
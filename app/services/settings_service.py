@@ -0,0 +1,121 @@
+import time
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from itertools import count
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.config import (
+    CHAT_SETTINGS_CACHE_SIZE,
+    CHAT_SETTINGS_TTL,
+    DEFAULT_MUTE_TIME,
+    MAX_WARNS,
+)
+from database.models import ChatConfig
+
+from loguru import logger
+
+
+@dataclass(frozen=True)
+class ChatSettings:
+    """
+    Effective settings of one chat: its ChatConfig row with the config defaults filled in.
+    Shared between handlers through the cache, so it is never modified.
+    """
+
+    chat_id: int
+    log_chat_id: int | None = None
+    max_warns: int = MAX_WARNS
+    # number of the auto-mute -> its duration
+    mute_schedule: dict[int, timedelta] | None = None
+    filter_links: bool = True
+    filter_bad_words: bool = True
+
+
+    def __post_init__(self):
+        if self.mute_schedule is None:
+            object.__setattr__(self, "mute_schedule", DEFAULT_MUTE_TIME)
+
+
+def _parse_mute_schedule(chat_id: int, value: str | None) -> dict[int, timedelta] | None:
+    if not value:
+        return None
+
+    try:
+        seconds = [int(part) for part in value.split(",")]
+    except ValueError:
+        logger.warning(f"Invalid mute schedule {value!r} of chat {chat_id}, using the default")
+        return None
+
+    return {number: timedelta(seconds=s) for number, s in enumerate(seconds, start=1)}
+
+
+def _from_config(chat_id: int, config: ChatConfig | None) -> ChatSettings:
+    if not config:
+        return ChatSettings(chat_id=chat_id)
+
+    def override(value, default):
+        return default if value is None else value
+
+    return ChatSettings(
+        chat_id=chat_id,
+        log_chat_id=config.log_chat_id,
+        max_warns=max(1, override(config.max_warns, MAX_WARNS)),
+        mute_schedule=_parse_mute_schedule(chat_id, config.mute_schedule),
+        filter_links=override(config.filter_links, True),
+        filter_bad_words=override(config.filter_bad_words, True),
+    )
+
+
+# chat_id -> (expires at, settings), least recently used first
+_chat_settings: OrderedDict[int, tuple[float, ChatSettings]] = OrderedDict()
+
+# chat_id -> token of the loads in flight for the chat; an invalidation drops it,
+# so settings loaded concurrently are not cached stale, and other chats are not affected
+_chat_settings_loads: dict[int, int] = {}
+_load_tokens = count(1)
+
+
+async def get_chat_settings(session: AsyncSession, chat_id: int) -> ChatSettings:
+    """
+    Returns the settings of a chat, reading its ChatConfig only when the cached copy
+    is missing or older than CHAT_SETTINGS_TTL. Chats without a row are cached too.
+    """
+
+    now = time.monotonic()
+
+    cached = _chat_settings.get(chat_id)
+    if cached and cached[0] > now:
+        _chat_settings.move_to_end(chat_id)
+        return cached[1]
+
+    load = _chat_settings_loads.setdefault(chat_id, next(_load_tokens))
+
+    try:
+        config = await session.get(ChatConfig, chat_id)
+    finally:
+        current = _chat_settings_loads.get(chat_id)
+        if current == load:
+            del _chat_settings_loads[chat_id]
+
+    settings = _from_config(chat_id, config)
+
+    if current == load:
+        _chat_settings[chat_id] = (now + CHAT_SETTINGS_TTL, settings)
+        _chat_settings.move_to_end(chat_id)
+
+        while len(_chat_settings) > CHAT_SETTINGS_CACHE_SIZE:
+            _chat_settings.popitem(last=False)
+
+    return settings
+
+
+def invalidate_chat_settings(chat_id: int):
+    """
+    Drops the cached settings of a chat. Call after its ChatConfig changes are committed.
+    """
+
+    _chat_settings_loads.pop(chat_id, None)
+    _chat_settings.pop(chat_id, None)
@@ -3,15 +3,20 @@ from datetime import timedelta
 from config.config import DEFAULT_MUTE_TIME
 
 
-def get_mute_duration(mutes_count: int) -> timedelta:
+def get_mute_duration(
+    mutes_count: int, schedule: dict[int, timedelta] = DEFAULT_MUTE_TIME
+) -> timedelta:
     """
     Calculates the duration of a mute based on the user's violation history.
+    Past the end of the schedule its last duration grows by 20% per mute.
     """
 
-    if mutes_count <= 5:
-        return DEFAULT_MUTE_TIME.get(mutes_count, timedelta(hours=1))
+    last = len(schedule)
 
-    base_time = timedelta(days=1).total_seconds()
-    extra_mutes = mutes_count - 5
+    if mutes_count <= last:
+        return schedule.get(mutes_count, timedelta(hours=1))
+
+    base_time = schedule[last].total_seconds()
+    extra_mutes = mutes_count - last
     multiplier = 1.2**extra_mutes
-    return timedelta(seconds=base_time * multiplier)
\ No newline at end of file
+    return timedelta(seconds=base_time * multiplier)
@@ -0,0 +1,219 @@
+import mmap
+import os
+import struct
+import sys
+
+from array import array
+from pathlib import Path
+
+from utils.matcher import BadWordMatcher, _tokens
+
+
+# magic, format version, source digest, normalization fingerprint,
+# states, edges, outputs, patterns, pattern blob size
+_HEADER = struct.Struct("<4sI16s8sIIIII")
+_MAGIC = b"BWIX" if sys.byteorder == "little" else b"XIWB"
+_FORMAT_VERSION = 3
+
+
+def write_index(
+    matcher: BadWordMatcher,
+    path: Path,
+    source: bytes,
+    fingerprint: bytes,
+):
+    """
+    Serializes a compiled automaton into a flat, memory-mappable index file.
+    source identifies the state of the ban-word files the list was read from.
+    The file is written next to its final path and moved into place atomically.
+    """
+
+    goto, fail, output = matcher._goto, matcher._fail, matcher._output
+
+    pattern_ids: dict[str, int] = {}
+    for words in output:
+        for word in words:
+            pattern_ids.setdefault(word, len(pattern_ids))
+
+    # transitions of every state sorted by code point, in compressed sparse row layout
+    edge_start, edge_chars, edge_targets = array("I", [0]), array("I"), array("I")
+    out_start, out_ids = array("I", [0]), array("I")
+
+    for transitions, words in zip(goto, output):
+        for char, target in sorted(transitions.items()):
+            edge_chars.append(ord(char))
+            edge_targets.append(target)
+        edge_start.append(len(edge_chars))
+
+        out_ids.extend(pattern_ids[word] for word in words)
+        out_start.append(len(out_ids))
+
+    blob = bytearray()
+    pattern_offsets = array("I", [0])
+    for word in pattern_ids:
+        blob += word.encode()
+        pattern_offsets.append(len(blob))
+
+    header = _HEADER.pack(
+        _MAGIC, _FORMAT_VERSION, source, fingerprint,
+        len(goto), len(edge_chars), len(out_ids), len(pattern_ids), len(blob),
+    )
+
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        for values in (edge_start, edge_chars, edge_targets, array("I", fail), out_start, out_ids, pattern_offsets):
+            values.tofile(f)
+        f.write(blob)
+
+    os.replace(tmp_path, path)
+
+
+def load_index(path: Path, source: bytes, fingerprint: bytes) -> "MappedMatcher | None":
+    """
+    Memory-maps an index file. Returns None if it is missing, corrupt
+    or older than the source list it was built from.
+    """
+
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    except (OSError, ValueError):
+        return None
+
+    if len(buffer) < _HEADER.size:
+        return None
+
+    magic, version, index_source, index_fingerprint, *counts = _HEADER.unpack_from(buffer)
+    states, edges, outputs, patterns, blob_size = counts
+
+    expected_size = _HEADER.size + 4 * (3 * states + 2 * edges + outputs + patterns + 3) + blob_size
+
+    if (
+        magic != _MAGIC
+        or version != _FORMAT_VERSION
+        or index_fingerprint != fingerprint
+        or index_source != source
+        or len(buffer) != expected_size
+    ):
+        return None
+
+    return MappedMatcher(buffer, *counts)
+
+
+class MappedMatcher:
+    """
+    Aho-Corasick automaton read from a memory-mapped index file.
+    Worker processes share the mapped pages instead of each building the automaton,
+    and only the states that texts actually reach are decoded into Python objects.
+    Same interface as BadWordMatcher.
+    """
+
+    def __init__(self, buffer: mmap.mmap, states: int, edges: int, outputs: int, patterns: int, blob_size: int):
+        view = memoryview(buffer)
+        offset = _HEADER.size
+
+        def take(length: int) -> memoryview:
+            nonlocal offset
+            part = view[offset:offset + length * 4].cast("I")
+            offset += length * 4
+            return part
+
+        self._edge_start = take(states + 1)
+        self._edge_chars = take(edges)
+        self._edge_targets = take(edges)
+        self._fail = take(states)
+        self._out_start = take(states + 1)
+        self._out_ids = take(outputs)
+        self._pattern_offsets = take(patterns + 1)
+        self._blob = view[offset:offset + blob_size]
+
+        self._buffer = buffer
+        self._states = states
+        self._patterns: dict[int, str] = {}
+
+        # transitions and outputs of a state are decoded into small dicts on first visit;
+        # only the states real texts reach end up in memory
+        self._goto: list[dict[str, int] | None] = [None] * states
+        self._output: list[tuple[str, ...] | None] = [None] * states
+
+        self.token = next(_tokens)
+
+
+    def __len__(self) -> int:
+        return self._states
+
+
+    def _pattern(self, pattern_id: int) -> str:
+        word = self._patterns.get(pattern_id)
+
+        if word is None:
+            start = self._pattern_offsets[pattern_id]
+            end = self._pattern_offsets[pattern_id + 1]
+            word = self._patterns[pattern_id] = bytes(self._blob[start:end]).decode()
+
+        return word
+
+
+    def _load_state(self, state: int) -> dict[str, int]:
+        start, end = self._edge_start[state], self._edge_start[state + 1]
+        goto = dict(zip(map(chr, self._edge_chars[start:end]), self._edge_targets[start:end]))
+
+        start, end = self._out_start[state], self._out_start[state + 1]
+        self._output[state] = tuple(self._pattern(i) for i in self._out_ids[start:end])
+
+        self._goto[state] = goto
+        return goto
+
+
+    def find_all(self, text: str) -> list[str]:
+        """
+        Returns every ban word found in the text, in order of first occurrence.
+        """
+
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        load_state = self._load_state
+
+        found = {}
+        state = 0
+
+        for char in text:
+            while True:
+                # leaf states have an empty dict, so only None means not decoded yet
+                transitions = goto[state]
+                if transitions is None:
+                    transitions = load_state(state)
+
+                next_state = transitions.get(char)
+
+                if next_state is not None:
+                    state = next_state
+                    break
+
+                if not state:
+                    break
+
+                state = fail[state]
+
+            words = output[state]
+            if words is None:
+                load_state(state)
+                words = output[state]
+
+            if words:
+                for word in words:
+                    found[word] = None
+
+        return list(found)
+
+
+if __name__ == "__main__":
+    # build step: python -m utils.index
+    # importing utils.text maps the index, building it first if it is missing or outdated
+    from utils.text import get_dictionary
+
+    print(f"Ban-word index ready: {len(get_dictionary().matcher)} states")
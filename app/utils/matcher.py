@@ -0,0 +1,144 @@
+from collections import deque
+from itertools import count
+from typing import Callable, Iterable, Mapping
+
+
+# every compiled matcher gets a unique token, e.g. to key caches of its results
+_tokens = count(1)
+
+
+class BadWordMatcher:
+    """
+    Aho-Corasick automaton built from the ban-word list.
+    Finds every ban word contained in a text in a single pass over it.
+    words maps each normalized pattern to the list entry reported when it is found.
+    """
+
+    def __init__(self, words: Mapping[str, str]):
+        goto: list[dict[str, int]] = [{}]
+        fail: list[int] = [0]
+        output: list[tuple[str, ...]] = [()]
+
+        # build the trie, every word ends in its own terminal state
+        for word, entry in words.items():
+            if not word:
+                continue
+
+            state = 0
+            for char in word:
+                next_state = goto[state].get(char)
+
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    fail.append(0)
+                    output.append(())
+
+                state = next_state
+
+            output[state] = (entry,)
+
+        # breadth-first pass: link every state to its longest proper suffix
+        # and inherit the words that end there
+        queue = deque(goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+
+                suffix = fail[state]
+                while suffix and char not in goto[suffix]:
+                    suffix = fail[suffix]
+
+                fail[next_state] = goto[suffix].get(char, 0)
+                output[next_state] += output[fail[next_state]]
+
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+
+        self.token = next(_tokens)
+
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+
+    def find_all(self, text: str) -> list[str]:
+        """
+        Returns every ban word found in the text, in order of first occurrence.
+        """
+
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+
+        found = {}
+        state = 0
+
+        for char in text:
+            while True:
+                next_state = goto[state].get(char)
+
+                if next_state is not None:
+                    state = next_state
+                    break
+
+                if not state:
+                    break
+
+                state = fail[state]
+
+            if output[state]:
+                for word in output[state]:
+                    found[word] = None
+
+        return list(found)
+
+
+
+class ChatMatcher:
+    """
+    Effective matcher of a single chat: the shared global automaton minus the
+    words the chat exempted, plus a small automaton for the words it added.
+    Exemptions are normalized patterns; a reported entry is exempt when normalize maps it to one.
+    """
+
+    def __init__(
+        self,
+        base: BadWordMatcher,
+        additions: Mapping[str, str],
+        exemptions: Iterable[str],
+        normalize: Callable[[str], str],
+    ):
+        self._base = base
+        self._extra = BadWordMatcher(additions) if additions else None
+        self._exempt = frozenset(exemptions)
+        self._normalize = normalize
+
+        self.token = next(_tokens)
+
+
+    def find_all(self, text: str) -> list[str]:
+        """
+        Returns every ban word of this chat found in the text.
+        """
+
+        return self.refine(self._base.find_all(text), text)
+
+
+    def refine(self, base_words: list[str], text: str) -> list[str]:
+        """
+        Applies the chat's exemptions and additions to words already found
+        in the text by the global automaton, e.g. in a worker process.
+        """
+
+        found = [word for word in base_words if self._normalize(word) not in self._exempt]
+
+        if self._extra:
+            found += [word for word in self._extra.find_all(text) if word not in found]
+
+        return found
@@ -1,48 +1,365 @@
+import asyncio
+
+from dataclasses import dataclass
+
+from hashlib import blake2b
+
+from typing import Iterable
+
 from string import punctuation
 
 import re
+import time
 
-from config.config import BAD_WORDS_FILE
+from config.config import BAD_WORDS_INDEX_FILE, BAD_WORDS_RELOAD_CHECK_INTERVAL
 
 from pathlib import Path
 
+from loguru import logger
+
+from database.word_store import ban_word_store
+from utils.index import MappedMatcher, load_index, write_index
+from utils.matcher import BadWordMatcher, ChatMatcher
+
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-with open(BASE_DIR / BAD_WORDS_FILE, encoding="utf-8") as f:
-    BAD_WORDS = {line.strip().lower() for line in f if line.strip()}
+LINK_PATTERN = re.compile(r"(?:https?://)?t\.me/[^\s]+")
+
+# Latin look-alikes and digit/symbol substitutions mapped to the Cyrillic letter they imitate;
+# only applied inside words that already contain Cyrillic, so English text is left as it is
+_HOMOGLYPHS = {
+    "a": "а", "c": "с", "e": "е", "k": "к", "m": "м", "o": "о",
+    "p": "р", "x": "х", "y": "у", "u": "и",
+    "0": "о", "3": "з", "4": "ч", "6": "б", "@": "а",
+}
+
+# zero-width, joiner, direction and variation-selector characters used to split words
+_INVISIBLE = (
+    "\u00ad\u034f\u061c\u115f\u1160\u17b4\u17b5\u180e"
+    "\u200b\u200c\u200d\u200e\u200f\u202a\u202b\u202c\u202d\u202e"
+    "\u2060\u2061\u2062\u2063\u2064\ufe0e\ufe0f\ufeff"
+)
+
+# built once: punctuation, invisible characters and combining accents, removed in one regex pass;
+# "@" is kept until the homoglyphs are replaced
+_STRIPPED = re.compile(
+    "[" + re.escape(punctuation.replace("@", "") + _INVISIBLE) + "\u0300-\u036f]+"
+)
+
+_HOMOGLYPH_TABLE = str.maketrans(_HOMOGLYPHS)
+
+_HOMOGLYPH_CHARS = re.escape("".join(_HOMOGLYPHS))
+
+# a Cyrillic letter and a look-alike in one word, in either order; two plain searches
+# reject a clean text in C without visiting its words one by one
+_CYRILLIC_THEN_HOMOGLYPH = re.compile(rf"[а-я][^\sа-я]*[{_HOMOGLYPH_CHARS}]")
+_HOMOGLYPH_THEN_CYRILLIC = re.compile(rf"[{_HOMOGLYPH_CHARS}][^\sа-я]*[а-я]")
+
+# the mixed words themselves, only looked up in texts that contain one
+_MIXED_WORD = re.compile(
+    rf"(?<!\S)(?=[^\sа-я]*[а-я])(?=[^\s{_HOMOGLYPH_CHARS}]*[{_HOMOGLYPH_CHARS}])\S+"
+)
+
+# three or more identical characters in a row are stretching, e.g. "бляяяять";
+# doubled letters are left alone because Russian words legitimately contain them
+_STRETCHED = re.compile(r"(\w)\1\1+")
+
+# normalized ban words shorter than this are only kept if normalization did not shorten them
+MIN_NORMALIZED_LENGTH = 3
+
 
 def normalize(text: str) -> str:
     """
-    Removes punctuation and converts text to lowercase for uniform comparison.
+    Converts text to lowercase, removes punctuation and invisible characters,
+    maps look-alike letters and digits in Cyrillic words to Cyrillic and collapses stretched letters.
     """
 
-    return text.translate(str.maketrans("", "", punctuation)).lower()
+    text = _STRIPPED.sub("", text.lower()).replace("ё", "е")
+
+    if _CYRILLIC_THEN_HOMOGLYPH.search(text) or _HOMOGLYPH_THEN_CYRILLIC.search(text):
+        # longer words first, so a word that contains a shorter one is replaced as a whole
+        for word in sorted(set(_MIXED_WORD.findall(text)), key=len, reverse=True):
+            text = text.replace(word, word.translate(_HOMOGLYPH_TABLE))
+
+    if "@" in text:
+        text = text.replace("@", "")
+
+    return _STRETCHED.sub(r"\1", text)
+
+
+@dataclass(frozen=True)
+class BadWordDictionary:
+    """
+    Immutable snapshot of the ban-word list and the automaton compiled from it.
+    A new snapshot with a higher version replaces the old one on every reload.
+    """
+
+    version: int
+    # disk_stat() of the ban-word files the snapshot was loaded from
+    stat: tuple
+    words: frozenset[str]
+    matcher: BadWordMatcher | MappedMatcher
+
+
+def load_bad_words() -> frozenset[str]:
+    """
+    Returns the global ban-word list, re-reading it if it was changed on disk.
+    """
+
+    return ban_word_store.words()
+
+
+def _entry_rank(word: str, pattern: str) -> tuple:
+    # the entry spelled like its pattern, otherwise the one with the fewest masking characters
+    return word != pattern, sum(not char.isalpha() for char in word), len(word), word
 
 
-def contains_bad_word(text: str) -> bool | list:
+def normalize_bad_words(words: Iterable[str]) -> dict[str, str]:
+    """
+    Puts ban words through the same normalization as message texts.
+    Returns the normalized patterns mapped to the list entry matchers report for them:
+    of several entries with one pattern, the one spelled like the pattern or else the cleanest.
+    Masked entries such as "х###" that collapse to one or two letters are skipped,
+    as they would match almost any text.
+    """
+
+    patterns = {}
+
+    for word in words:
+        pattern = normalize(word)
+
+        if len(pattern) < MIN_NORMALIZED_LENGTH and len(pattern) != len(word):
+            continue
+
+        current = patterns.get(pattern)
+        if current is None or _entry_rank(word, pattern) < _entry_rank(current, pattern):
+            patterns[pattern] = word
+
+    return patterns
+
+
+def _index_fingerprint() -> bytes:
+    """
+    Identifies the normalization rules, so an index built with other rules is not reused.
+    """
+
+    rules = repr((
+        _STRIPPED.pattern,
+        sorted(_HOMOGLYPHS.items()),
+        _MIXED_WORD.pattern,
+        _STRETCHED.pattern,
+        MIN_NORMALIZED_LENGTH,
+    ))
+    return blake2b(rules.encode(), digest_size=8).digest()
+
+
+def source_digest(words: Iterable[str]) -> bytes:
+    """
+    Identifies the ban-word list an index was built from by its content,
+    so an index stays valid when the files are copied, e.g. into a Docker volume.
+    """
+
+    return blake2b("\n".join(sorted(words)).encode(), digest_size=16).digest()
+
+
+def build_index(words: frozenset[str], source: bytes) -> BadWordMatcher | MappedMatcher:
+    """
+    Compiles the automaton and writes it to the index file.
+    Returns the memory-mapped index, or the in-memory automaton if it can't be written.
+    """
+
+    matcher = BadWordMatcher(normalize_bad_words(words))
+    index_path = BASE_DIR / BAD_WORDS_INDEX_FILE
+
+    try:
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        write_index(matcher, index_path, source, _index_fingerprint())
+
+    except OSError as e:
+        logger.warning(f"Could not write ban-word index {index_path}: {e}")
+        return matcher
+
+    return load_index(index_path, source, _index_fingerprint()) or matcher
+
+
+def _compile_bad_words() -> tuple[tuple, frozenset[str], BadWordMatcher | MappedMatcher]:
+    """
+    Loads the ban-word list and maps its prebuilt index,
+    rebuilding the index first when it was built from another list.
+    """
+
+    stat, words = ban_word_store.snapshot()
+    source = source_digest(words)
+
+    matcher = load_index(BASE_DIR / BAD_WORDS_INDEX_FILE, source, _index_fingerprint())
+
+    if matcher is None:
+        logger.info("Ban-word index is missing or outdated, rebuilding it")
+        matcher = build_index(words, source)
+
+    return stat, words, matcher
+
+
+_dictionary = BadWordDictionary(1, *_compile_bad_words())
+
+_reload_task: asyncio.Task | None = None
+_reload_pending = False
+_next_check = time.monotonic() + BAD_WORDS_RELOAD_CHECK_INTERVAL
+
+
+def _check_for_edits():
+    """
+    Schedules a reload when the ban-word files were edited since the current snapshot,
+    e.g. with the word_store command line. Does nothing outside the event loop.
+    """
+
+    global _next_check
+
+    now = time.monotonic()
+    if now < _next_check:
+        return
+
+    _next_check = now + BAD_WORDS_RELOAD_CHECK_INTERVAL
+
+    if _reload_task and not _reload_task.done():
+        return
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return
+
+    if ban_word_store.disk_stat() != _dictionary.stat:
+        schedule_reload()
+
+
+def get_dictionary() -> BadWordDictionary:
+    """
+    Returns the current ban-word snapshot, starting a background reload
+    if the list changed on disk.
+    Callers should keep the returned object for the whole scan of one text.
+    """
+
+    _check_for_edits()
+
+    return _dictionary
+
+
+async def reload_dictionary() -> BadWordDictionary:
+    """
+    Rebuilds the ban-word automaton in a worker thread and swaps it in.
+    Scans that already hold the previous snapshot keep using it.
+    """
+
+    global _dictionary
+
+    stat, words, matcher = await asyncio.to_thread(_compile_bad_words)
+
+    _dictionary = BadWordDictionary(_dictionary.version + 1, stat, words, matcher)
+    logger.info(
+        f"Ban-word dictionary reloaded: version {_dictionary.version}, {len(words)} words"
+    )
+
+    return _dictionary
+
+
+async def _reload_loop():
+    global _reload_pending
+
+    while True:
+        _reload_pending = False
+
+        try:
+            await reload_dictionary()
+
+        except Exception:
+            logger.exception("Failed to reload ban-word dictionary")
+
+        if not _reload_pending:
+            return
+
+
+def schedule_reload():
+    """
+    Starts a background reload of the ban-word dictionary.
+    Requests that arrive while a rebuild is running are merged into one more rebuild.
+    """
+
+    global _reload_task, _reload_pending
+
+    if _reload_task and not _reload_task.done():
+        _reload_pending = True
+        return
+
+    _reload_task = asyncio.create_task(_reload_loop())
+
+
+def contains_bad_word(
+    text: str, matcher: BadWordMatcher | ChatMatcher | None = None
+) -> bool | list:
     """
     Checks if the provided text contains any prohibited words from the blacklist.
     Supports both exact matches and substring detection.
+    Uses the global list unless a chat-specific matcher is given.
     """
 
-    normalized = normalize(text)
+    if matcher is None:
+        matcher = get_dictionary().matcher
 
-    bad_words = []
+    bad_words = matcher.find_all(normalize(text))
 
-    for bad_word in BAD_WORDS:
-        if bad_word in normalized:
-            bad_words.append(bad_word)
-    
     if bad_words:
         return bad_words
-        
+
     return False
 
 
 def contains_link(text: str) -> bool:
-    pattern = r'(https?://)?t\.me/[^\s]+'
+    return LINK_PATTERN.search(text) is not None
+
+
+@dataclass(frozen=True)
+class ScanVerdict:
+    """
+    Result of scanning one message text.
+    rule names the check that fired first: "link", "bad_word" or None for a clean text.
+    """
+
+    links: list[str]
+    bad_words: list[str]
+    rule: str | None
+
+    @classmethod
+    def build(cls, links: list[str], bad_words: list[str]) -> "ScanVerdict":
+        if links:
+            rule = "link"
+        elif bad_words:
+            rule = "bad_word"
+        else:
+            rule = None
+
+        return cls(links=links, bad_words=bad_words, rule=rule)
+
+
+def scan_text(
+    text: str,
+    matcher: BadWordMatcher | ChatMatcher | None = None,
+    first_rule_only: bool = True,
+) -> ScanVerdict:
+    """
+    Runs the moderation checks over a text, normalizing it only once.
+    By default the checks stop at the first rule that fires, so a text with a link
+    is not scanned for ban words; pass first_rule_only=False to collect everything.
+    Uses the global list unless a chat-specific matcher is given.
+    """
+
+    links = LINK_PATTERN.findall(text)
+
+    if links and first_rule_only:
+        return ScanVerdict.build(links, [])
+
+    if matcher is None:
+        matcher = get_dictionary().matcher
 
-    matches = re.findall(pattern, text)
-    
-    return bool(matches)
\ No newline at end of file
+    return ScanVerdict.build(links, matcher.find_all(normalize(text)))